@@ -3,21 +3,35 @@ import os
 import time
 import pandas as pd
 import traceback
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
+from bse_http_fetcher import BseHttpFetcher
+from driver_manager import DriverManager
+from filing_manifest import FilingManifest, MANIFEST_FILE_NAME
+from scraper_waits import (step_timer, wait_for_elements, wait_for_clickable, wait_for_new_window,
+                           wait_for_window_count, wait_for_filing, XML_VIEWER_ID)
 
 # Chrome options
 options = Options()
 options.add_argument("--start-maximized")
 options.add_argument("--headless")  # Comment this line if you want to see browser actions
 
+# One Chrome session reused across companies and attempts; restarted when unhealthy, after many pages or high RSS
+driver_manager = DriverManager(options)
+
 # Initialize a list to hold log data
 log_data = []
 
+# Fetch filings over HTTP first; Chrome is only started for companies where the postback replay fails
+USE_HTTP_FETCHER = True
+http_fetcher = BseHttpFetcher() if USE_HTTP_FETCHER else None
+
+# Filings saved by earlier runs, kept next to the company folders; opened once base_path is known
+filing_manifest = None
+
 def log_message(stock_name, file_name, url, status, error_line=None):
     log_data.append({
         "Stock Name": stock_name,
@@ -28,13 +42,27 @@ def log_message(stock_name, file_name, url, status, error_line=None):
     })
 
 def XML_extraction_with_retry(sr_no, row_number, security_code, stock_name, save_folder, max_retries=5):
+    only = None  # Filings left for the browser; None means all of them
+    if http_fetcher is not None:
+        outcome = http_fetcher.save_filings(security_code, stock_name, save_folder, filing_manifest)
+        if outcome is None:
+            print(f"Falling back to the browser for {stock_name}")
+        else:
+            results, failed = outcome
+            for file_name, url, status, error_line in results:
+                log_message(stock_name, file_name, url, status, error_line)
+            if not failed:
+                return
+            only = {file_name for file_name, url, error_line in failed}
+            print(f"Falling back to the browser for {len(only)} filing(s) of {stock_name}")
+
     retry_count = 0
     success = False
 
     while retry_count < max_retries and not success:
         retry_count += 1
         print(f"Attempt {retry_count} for {stock_name}")
-        success = XML_extraction(sr_no, row_number, security_code, stock_name, save_folder)
+        success = XML_extraction(sr_no, row_number, security_code, stock_name, save_folder, only)
 
         if not success:
             wait_time = 2 ** retry_count
@@ -44,12 +72,15 @@ def XML_extraction_with_retry(sr_no, row_number, security_code, stock_name, save
     if not success:
         print(f"All {max_retries} attempts failed for {stock_name}. Moving to the next company.")
 
-def XML_extraction(sr_no, row_number, security_code, stock_name, save_folder):
+# `only` limits the browser to the named filings (the ones the HTTP fetcher could not download)
+def XML_extraction(sr_no, row_number, security_code, stock_name, save_folder, only=None):
     Top_URL = "https://www.bseindia.com/corporates/Comp_Resultsnew.aspx"
-    driver = webdriver.Chrome(options=options)
-    driver.get(Top_URL)
-
     try:
+        driver = driver_manager.get()
+        with step_timer.step('results_page'):
+            driver.get(Top_URL)
+        driver_manager.record_pages()
+
         Security_Search = WebDriverWait(driver, 10).until(
             EC.visibility_of_element_located((By.ID, "ContentPlaceHolder1_SmartSearch_smartSearch"))
         )
@@ -66,9 +97,8 @@ def XML_extraction(sr_no, row_number, security_code, stock_name, save_folder):
         Submit_button = driver.find_element(By.ID, "ContentPlaceHolder1_btnSubmit")
         Submit_button.click()
 
-        rows = driver.find_elements(By.XPATH, f"//td[text()='{security_code}']/following-sibling::td[5]//a")
+        rows = wait_for_elements(driver, f"//td[text()='{security_code}']/following-sibling::td[5]//a")
         File_Name_rows = driver.find_elements(By.XPATH, f"//td[text()='{security_code}']/following-sibling::td[3]//a")
-        time.sleep(1)
 
         success_count = 0
 
@@ -76,33 +106,36 @@ def XML_extraction(sr_no, row_number, security_code, stock_name, save_folder):
             link = rows[i]
             File_Name = File_Name_rows[i].text
             print(File_Name)
-            time.sleep(1)
+            if only is not None and File_Name not in only:
+                continue
+            if filing_manifest is not None and filing_manifest.is_known(security_code, File_Name, save_folder):
+                log_message(stock_name, File_Name, Top_URL, "Skipped (in manifest)")
+                success_count += 1
+                continue
 
             main_window = driver.current_window_handle
+            wait_for_clickable(driver, link)
             driver.execute_script("arguments[0].click();", link)
 
-            WebDriverWait(driver, 10).until(lambda d: len(d.window_handles) > 1)
-            driver.switch_to.window(driver.window_handles[-1])
-
-            time.sleep(2)
-            page_content = driver.page_source
+            driver.switch_to.window(wait_for_new_window(driver, 1))
+            driver_manager.record_pages()
 
             try:
-                if '<ix:header>' in page_content:
+                if wait_for_filing(driver) == 'html':
                     custom_file_name = f"{stock_name}_{File_Name}.html"
                     custom_file_path = os.path.join(save_folder, custom_file_name)
                     with open(custom_file_path, 'w', encoding='utf-8') as file:
-                        file.write(page_content)
+                        file.write(driver.page_source)
                 else:
-                    xml_div = WebDriverWait(driver, 5).until(
-                        EC.presence_of_element_located((By.ID, 'webkit-xml-viewer-source-xml'))
-                    )
+                    xml_div = driver.find_element(By.ID, XML_VIEWER_ID)
                     xml_content = xml_div.get_attribute('innerHTML')
                     custom_file_name = f"{stock_name}_{File_Name}.xml"
                     custom_file_path = os.path.join(save_folder, custom_file_name)
                     with open(custom_file_path, 'w', encoding='utf-8') as file:
                         file.write(xml_content)
 
+                if filing_manifest is not None:
+                    filing_manifest.record(security_code, File_Name, custom_file_path)
                 log_message(stock_name, File_Name, driver.current_url, "Success")
                 success_count += 1
 
@@ -117,8 +150,8 @@ def XML_extraction(sr_no, row_number, security_code, stock_name, save_folder):
                 print(f"Error saving file for {stock_name} - {File_Name}: {str(e)}")
 
             driver.close()
+            wait_for_window_count(driver, 1)
             driver.switch_to.window(main_window)
-            time.sleep(1)
 
         return success_count > 0
 
@@ -133,9 +166,6 @@ def XML_extraction(sr_no, row_number, security_code, stock_name, save_folder):
         print(f"Error occurred during XML extraction for {stock_name}: {str(e)}")
         return False
 
-    finally:
-        driver.quit()
-
 # Path to your input Excel file
 Sample_List = r"D:\FinancialStatementAnalysis\03input\Samples500_v2.xlsx"
 df = pd.read_excel(Sample_List, sheet_name='Sheet1')
@@ -148,6 +178,7 @@ if start_row < 1 or end_row > len(df):
 else:
     df_range = df.iloc[start_row-1:end_row]
     base_path = r"D:\FinancialStatementAnalysis\test"
+    filing_manifest = FilingManifest(os.path.join(base_path, MANIFEST_FILE_NAME))
 
     for row_number, (index, row) in enumerate(df_range.iterrows(), start=start_row):
         sr_no = str(row['Sr. No.'])
@@ -159,6 +190,11 @@ else:
         os.makedirs(Save_Folder, exist_ok=True)
 
         XML_extraction_with_retry(sr_no, row_number, security_code, stock_name, Save_Folder)
+        filing_manifest.save()
+
+    driver_manager.quit()
+    print(driver_manager.describe())
+    step_timer.report()
 
     base_log_path = r"D:\FinancialStatementAnalysis\test"
     os.makedirs(base_log_path, exist_ok=True)
@@ -2,22 +2,37 @@ import os
 import time
 import pandas as pd
 import traceback
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
+from bse_http_fetcher import BseHttpFetcher
+from driver_manager import DriverManager
+from filing_manifest import FilingManifest, MANIFEST_FILE_NAME
+from scraper_waits import (step_timer, wait_for_elements, wait_for_clickable, wait_for_new_window,
+                           wait_for_window_count, wait_for_filing, XML_VIEWER_ID)
 
 # Chrome options
 options = Options()
 options.add_argument("--start-maximized")
 options.add_argument("--headless")  # If you want to see browser interactions, comment this line
 
+# One Chrome session reused across companies and attempts; restarted when unhealthy, after many pages or high RSS
+driver_manager = DriverManager(options)
+
 # Initialize a list to hold log data
 log_data = []
 
+# Fetch filings over HTTP first; Chrome is only started for companies where the postback replay fails
+USE_HTTP_FETCHER = True
+# link_offset=6: the XBRL link column, as in the td[6] XPath below
+http_fetcher = BseHttpFetcher(link_offset=6) if USE_HTTP_FETCHER else None
+
+# Filings saved by earlier runs, kept next to the company folders; opened once base_path is known
+filing_manifest = None
+
 def log_message(stock_name, file_name, url, status, error_line=None):
     log_data.append({
         "Stock Name": stock_name,
@@ -28,13 +43,27 @@ def log_message(stock_name, file_name, url, status, error_line=None):
     })
 
 def XML_extraction_with_retry(sr_no, row_number, security_code, stock_name, save_folder, max_retries=5):
+    only = None  # Filings left for the browser; None means all of them
+    if http_fetcher is not None:
+        outcome = http_fetcher.save_filings(security_code, stock_name, save_folder, filing_manifest)
+        if outcome is None:
+            print(f"Falling back to the browser for {stock_name}")
+        else:
+            results, failed = outcome
+            for file_name, url, status, error_line in results:
+                log_message(stock_name, file_name, url, status, error_line)
+            if not failed:
+                return
+            only = {file_name for file_name, url, error_line in failed}
+            print(f"Falling back to the browser for {len(only)} filing(s) of {stock_name}")
+
     retry_count = 0
     success = False
 
     while retry_count < max_retries and not success:
         retry_count += 1
         print(f"Attempt {retry_count} for {stock_name}")
-        success = XML_extraction(sr_no, row_number, security_code, stock_name, save_folder)
+        success = XML_extraction(sr_no, row_number, security_code, stock_name, save_folder, only)
 
         if not success:
             wait_time = 2 ** retry_count  # Exponential backoff: 2, 4, 8, 16, ...
@@ -47,12 +76,15 @@ def XML_extraction_with_retry(sr_no, row_number, security_code, stock_name, save
 # Main function usage remains the same
 
 
-def XML_extraction(sr_no, row_number, security_code, stock_name, save_folder):
+# `only` limits the browser to the named filings (the ones the HTTP fetcher could not download)
+def XML_extraction(sr_no, row_number, security_code, stock_name, save_folder, only=None):
     Top_URL = "https://www.bseindia.com/corporates/Comp_Resultsnew.aspx"
-    driver = webdriver.Chrome(options=options)
-    driver.get(Top_URL)
-
     try:
+        driver = driver_manager.get()
+        with step_timer.step('results_page'):
+            driver.get(Top_URL)
+        driver_manager.record_pages()
+
         Security_Search = WebDriverWait(driver, 10).until(
             EC.visibility_of_element_located((By.ID, "ContentPlaceHolder1_SmartSearch_smartSearch"))
         )
@@ -69,9 +101,8 @@ def XML_extraction(sr_no, row_number, security_code, stock_name, save_folder):
         Submit_button = driver.find_element(By.ID, "ContentPlaceHolder1_btnSubmit")
         Submit_button.click()
 
-        rows = driver.find_elements(By.XPATH, f"//td[text()='{security_code}']/following-sibling::td[6]//a")
+        rows = wait_for_elements(driver, f"//td[text()='{security_code}']/following-sibling::td[6]//a")
         File_Name_rows = driver.find_elements(By.XPATH, f"//td[text()='{security_code}']/following-sibling::td[3]//a")
-        time.sleep(1)
 
         success_count = 0
 
@@ -79,9 +110,16 @@ def XML_extraction(sr_no, row_number, security_code, stock_name, save_folder):
             link = rows[i]
             File_Name = File_Name_rows[i].text
             print(File_Name)
-            time.sleep(1)
+            if only is not None and File_Name not in only:
+                continue
+            if filing_manifest is not None and filing_manifest.is_known(security_code, File_Name, save_folder):
+                log_message(stock_name, File_Name, Top_URL, "Skipped (in manifest)")
+                success_count += 1
+                continue
+            wait_for_clickable(driver, link)
             link.click()
-            driver.switch_to.window(driver.window_handles[-1])
+            driver.switch_to.window(wait_for_new_window(driver, 1))
+            driver_manager.record_pages()
             current_url = driver.current_url
             print(current_url)
 
@@ -90,16 +128,18 @@ def XML_extraction(sr_no, row_number, security_code, stock_name, save_folder):
             custom_file_path = os.path.join(save_folder, custom_file_name)  # Keep .xml extension
 
             try:
-                # Extract the XML content directly
-                xml_div = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.ID, 'webkit-xml-viewer-source-xml'))
-                )
+                # Extract the XML content directly once the viewer has rendered it
+                wait_for_filing(driver)
+                xml_div = driver.find_element(By.ID, XML_VIEWER_ID)
                 xml_content = xml_div.get_attribute('innerHTML')  # Extract the XML content
 
                 # Save XML content
                 with open(custom_file_path, 'w', encoding='utf-8') as file:
                     file.write(xml_content)
 
+                if filing_manifest is not None:
+                    filing_manifest.record(security_code, File_Name, custom_file_path)
+
                 # Log success
                 log_message(stock_name, File_Name, current_url, "Success")
                 success_count += 1
@@ -116,8 +156,8 @@ def XML_extraction(sr_no, row_number, security_code, stock_name, save_folder):
                 print(f"Error saving XML file for {stock_name} - {File_Name}: {str(e)}")
 
             driver.close()
+            wait_for_window_count(driver, 1)
             driver.switch_to.window(driver.window_handles[0])
-            time.sleep(1)
 
         return success_count > 0  # Return True if at least one file is successfully downloaded
 
@@ -132,9 +172,6 @@ def XML_extraction(sr_no, row_number, security_code, stock_name, save_folder):
         print(f"Error occurred during XML extraction for {stock_name}: {str(e)}")
         return False  # Indicate failure for the entire company
 
-    finally:
-        driver.quit()
-
 # Path to your input Excel file
 Sample_List = r"D:\Consolidated_xml_file\input\ListofStocks.xlsx"
 
@@ -153,6 +190,7 @@ else:
 
     # Base path for saving XML files
     base_path = r"D:\Consolidated_xml_file\xml"
+    filing_manifest = FilingManifest(os.path.join(base_path, MANIFEST_FILE_NAME))
 
     # Using the Excel row number for saving files
     for row_number, (index, row) in enumerate(df_range.iterrows(), start=start_row):
@@ -167,6 +205,11 @@ else:
 
         # Pass the row number from Excel to the XML extraction function
         XML_extraction_with_retry(sr_no, row_number, security_code, stock_name, Save_Folder)
+        filing_manifest.save()
+
+    driver_manager.quit()
+    print(driver_manager.describe())
+    step_timer.report()
 
     # Save the log data to an Excel file
     base_log_path = r"D:\Consolidated_xml_file\log"
@@ -1,6 +1,5 @@
 # Loop through each company in the DataFrame
 import os
-import time
 import pandas as pd
 import traceback
 from selenium import webdriver
@@ -9,6 +8,7 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
+from scraper_waits import step_timer, wait_for_new_window, wait_for_window_count, wait_for_filing, XML_VIEWER_ID
 
 # Chrome options
 options = Options()
@@ -84,23 +84,18 @@ def XML_extraction(security_code,symbol,start_period,end_period,save_folder):
 
                 if found_start:
                     link.click()
-                    driver.switch_to.window(driver.window_handles[-1])
+                    driver.switch_to.window(wait_for_new_window(driver, 1))
                     current_url = driver.current_url
                     
                     try:
-                        time.sleep(2)
-                        page_content = driver.page_source
-
-                        if '<ix:header>' in page_content:
+                        if wait_for_filing(driver) == 'html':
                             custom_file_name = f"{symbol}_{period_text}.html"
                             custom_file_path = os.path.join(save_folder, custom_file_name)
                             with open (custom_file_path, 'w', encoding = 'utf-8') as file:
-                                file.write(page_content)
+                                file.write(driver.page_source)
 
                         else:   
-                            xml_div = WebDriverWait(driver,10).until(
-                                EC.presence_of_element_located((By.ID , 'webkit-xml-viewer-source-xml'))
-                            )
+                            xml_div = driver.find_element(By.ID, XML_VIEWER_ID)
                             xml_content = xml_div.get_attribute('innerHTML')
                             custom_file_name = f"{symbol}_{period_text}.xml"
                             custom_file_path = os.path.join(save_folder, custom_file_name)
@@ -116,6 +111,7 @@ def XML_extraction(security_code,symbol,start_period,end_period,save_folder):
                         print(f"Error saving file:{e}")
 
                     driver.close()
+                    wait_for_window_count(driver, 1)
                     driver.switch_to.window(driver.window_handles[0])
                 
                     if period_text == end_period:
@@ -182,5 +178,6 @@ os.makedirs(base_log_path, exist_ok=True)
 log_file_name = "log_results_for_period_1_to_6.xlsx"
 log_df = pd.DataFrame(log_data, columns=["Symbol", "File Name", "URL", "Status", "Error Line"])
 log_df.to_excel(os.path.join(base_log_path, log_file_name), index=False)
+step_timer.report()
 
 print("Process complete")
\ No newline at end of file
@@ -0,0 +1,51 @@
+## Benchmark: repeated pd.concat in the symbol loop versus FrameAccumulator
+import sys
+import time
+import numpy as np
+import pandas as pd
+from frame_accumulator import FrameAccumulator
+
+SYMBOL_COUNTS = [100, 200, 400, 800]
+ROWS_PER_SYMBOL = 2500  # Roughly ten years of daily bars
+
+
+# Function to build one symbol's frame shaped like app.py's fetch_stock_data output
+def make_symbol_frame(symbol, row_count):
+    closes = np.linspace(100, 200, row_count)
+    return pd.DataFrame({
+        'Date': pd.bdate_range('2015-01-01', periods=row_count),
+        'Open': closes, 'High': closes + 1, 'Low': closes - 1, 'Close': closes,
+        'Volume': np.arange(row_count, dtype='int64'),
+        'Symbol': symbol, 'Company Code': 500000,
+    })
+
+
+# Old main() pattern: every iteration copies everything gathered so far
+def repeated_concat(frames):
+    final_data = pd.DataFrame()
+    for stock_data in frames:
+        final_data = pd.concat([final_data, stock_data], ignore_index=True)
+    return final_data
+
+
+def accumulate(frames):
+    accumulator = FrameAccumulator()
+    for stock_data in frames:
+        accumulator.add(stock_data)
+    return accumulator.materialize()
+
+
+def time_call(func, frames):
+    started = time.perf_counter()
+    result = func(frames)
+    return time.perf_counter() - started, len(result)
+
+
+if __name__ == "__main__":
+    symbol_counts = [int(arg) for arg in sys.argv[1:]] or SYMBOL_COUNTS
+    print(f"{'symbols':>8} {'rows':>10} {'concat loop (s)':>16} {'accumulator (s)':>16} {'speedup':>8}")
+    for symbol_count in symbol_counts:
+        frames = [make_symbol_frame(f"SYM{i}", ROWS_PER_SYMBOL) for i in range(symbol_count)]
+        concat_time, rows = time_call(repeated_concat, frames)
+        accumulate_time, _ = time_call(accumulate, frames)
+        print(f"{symbol_count:>8} {rows:>10} {concat_time:>16.3f} {accumulate_time:>16.3f} {concat_time / accumulate_time:>7.1f}x")
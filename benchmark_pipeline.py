@@ -0,0 +1,177 @@
+## Benchmark: fetch_historical_data -> validate_columns -> save_to_postgres with yfinance replaced by a fixture
+import os
+import sys
+import json
+import time
+import zlib
+import platform
+import subprocess
+import multiprocessing
+from datetime import datetime
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+UNIVERSE_SIZES = [50, 500, 5000]
+HISTORY_START = '2019-01-01'
+HISTORY_END = '2024-01-01'  # Five years, about 1300 bars per symbol
+
+# Sink used for the run; a local SQLite file by default, set BENCH_DATABASE_URI to measure PostgreSQL (and COPY)
+BENCH_DATABASE_URI = os.environ.get('BENCH_DATABASE_URI', 'sqlite:///benchmark_pipeline.db')
+BENCH_TABLE = 'bench_pipeline'
+RESULTS_DIR = 'benchmark_results'
+
+
+# Deterministic stand-in for yf.Ticker: the same symbol and range always give the same OHLCV frame
+class FixtureTicker:
+    def __init__(self, ticker):
+        self.ticker = ticker
+
+    def history(self, start=None, end=None, interval='1d', auto_adjust=True, **kwargs):
+        dates = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), tz='Asia/Kolkata', name='Date')
+        rng = np.random.default_rng(zlib.crc32(self.ticker.encode()))
+        n = len(dates)
+
+        # Random-walk closes with intraday ranges, occasional dividends and a rare split
+        closes = (rng.uniform(50, 3000) * np.exp(np.cumsum(rng.normal(0, 0.015, n)))).round(2)
+        opens = (closes * (1 + rng.normal(0, 0.005, n))).round(2)
+        highs = np.maximum(opens, closes) * (1 + rng.uniform(0, 0.02, n))
+        lows = np.minimum(opens, closes) * (1 - rng.uniform(0, 0.02, n))
+        dividends = np.where(rng.random(n) < 0.004, (closes * 0.01).round(2), 0.0)
+        splits = np.where(rng.random(n) < 0.0004, 2.0, 0.0)
+
+        return pd.DataFrame({
+            'Open': opens, 'High': highs.round(2), 'Low': lows.round(2), 'Close': closes,
+            'Volume': rng.integers(1_000, 5_000_000, n), 'Dividends': dividends, 'Stock Splits': splits,
+        }, index=dates)
+
+
+# Accumulates wall time spent in each wrapped pipeline stage
+class StageTimer:
+    def __init__(self):
+        self.seconds = {}
+
+    def wrap(self, stage, func):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.seconds[stage] = self.seconds.get(stage, 0.0) + time.perf_counter() - started
+        return timed
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)  # Bytes on macOS, KiB on Linux
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)  # Windows
+    except (ImportError, AttributeError):
+        return None
+
+
+# Function to run the pipeline for one universe size; runs in its own process so peak RSS is per size
+def run_universe(symbol_count, database_uri=BENCH_DATABASE_URI):
+    import fetch_stock_data as pipeline
+    from symbol_master import SymbolMaster
+
+    engine = create_engine(database_uri)
+    with engine.begin() as connection:
+        connection.execute(text(f'DROP TABLE IF EXISTS {BENCH_TABLE}'))
+
+    # Point the pipeline at the fixture and the benchmark table, with only the database sink enabled
+    timer = StageTimer()
+    FixtureTicker.history = timer.wrap('fetch', FixtureTicker.history)
+    pipeline.yf = SimpleNamespace(Ticker=FixtureTicker)
+    pipeline.engine = engine
+    pipeline.SINKS = {'postgres'}
+    pipeline.excel_sink = None
+    pipeline.progress_journal = None
+    pipeline.COPY_TABLES = {BENCH_TABLE} if engine.dialect.name == 'postgresql' else set()  # COPY FROM STDIN is PostgreSQL-only
+    for stage, name in (('adjust', 'adjust_prices'), ('schema', 'apply_price_schema'),
+                        ('validate', 'validate_columns'), ('save', 'save_to_postgres')):
+        setattr(pipeline, name, timer.wrap(stage, getattr(pipeline, name)))
+    save_to_sinks = pipeline.save_to_sinks
+    pipeline.save_to_sinks = lambda data, table_name, unit=None: save_to_sinks(data, BENCH_TABLE, unit)
+
+    symbols = pd.DataFrame({'Symbol': [f"SYM{i:05d}" for i in range(symbol_count)],
+                            'Security Code': np.arange(500000, 500000 + symbol_count)})
+    symbol_master = SymbolMaster(symbols)
+
+    rows = 0
+    started = time.perf_counter()
+    for symbol in symbols['Symbol']:
+        # Each symbol is saved on its own, the way the per-row path writes it
+        data = pipeline.fetch_historical_data(symbol, HISTORY_START, HISTORY_END, symbol_master, '1d')
+        rows += len(data)
+    wall_time = time.perf_counter() - started
+
+    with engine.connect() as connection:
+        stored_rows = connection.execute(text(f'SELECT COUNT(*) FROM {BENCH_TABLE}')).scalar()
+
+    timed = sum(timer.seconds.values()) - timer.seconds.get('validate', 0.0)  # validate runs inside save
+    stages = {stage: round(seconds, 3) for stage, seconds in timer.seconds.items()}
+    stages['other'] = round(max(wall_time - timed, 0.0), 3)
+    return {
+        'symbols': symbol_count,
+        'rows': rows,
+        'stored_rows': stored_rows,
+        'wall_time_s': round(wall_time, 3),
+        'rows_per_s': round(rows / wall_time, 1) if wall_time else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'stage_s': stages,
+    }
+
+
+def _run_in_child(symbol_count, database_uri, results):
+    results.put(run_universe(symbol_count, database_uri))
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    universe_sizes = [int(arg) for arg in sys.argv[1:]] or UNIVERSE_SIZES
+    context = multiprocessing.get_context('spawn')
+
+    results = []
+    print(f"{'symbols':>8} {'rows':>10} {'wall (s)':>10} {'rows/s':>10} {'peak RSS (MB)':>14}  stages (s)")
+    for symbol_count in universe_sizes:
+        queue = context.Queue()
+        worker = context.Process(target=_run_in_child, args=(symbol_count, BENCH_DATABASE_URI, queue))
+        worker.start()
+        worker.join()
+        if worker.exitcode != 0:
+            raise RuntimeError(f"Benchmark run for {symbol_count} symbols failed (exit code {worker.exitcode})")
+        result = queue.get()
+        results.append(result)
+        stages = ", ".join(f"{stage} {seconds:.2f}" for stage, seconds in result['stage_s'].items())
+        print(f"{result['symbols']:>8} {result['rows']:>10} {result['wall_time_s']:>10.2f} {result['rows_per_s']:>10.0f} "
+              f"{str(result['peak_rss_mb']):>14}  {stages}")
+
+    # Machine-readable results, one file per run, for comparing versions
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output_path = os.path.join(RESULTS_DIR, f"pipeline-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output_path, 'w') as f:
+        json.dump({
+            'benchmark': 'pipeline',
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'database': create_engine(BENCH_DATABASE_URI).dialect.name,
+            'history': {'start': HISTORY_START, 'end': HISTORY_END},
+            'results': results,
+        }, f, indent=2)
+    print(f"Results written to {output_path}")
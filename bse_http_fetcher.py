@@ -0,0 +1,195 @@
+## HTTP-level BSE filings fetcher: replays the results-page ASP.NET postback instead of driving Chrome
+import os
+import re
+import traceback
+from urllib.parse import urljoin
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup
+
+# Results page the scrapers open, and the element IDs they use on it
+RESULTS_URL = "https://www.bseindia.com/corporates/Comp_Resultsnew.aspx"
+SEARCH_BOX_ID = "ContentPlaceHolder1_SmartSearch_smartSearch"
+BROADCAST_DROPDOWN_ID = "ContentPlaceHolder1_broadcastdd"
+SUBMIT_BUTTON_ID = "ContentPlaceHolder1_btnSubmit"
+BROADCAST_VALUE = "7"
+
+# Hidden inputs the SmartSearch suggestion fills with the picked scrip code (matched case-insensitively on id or name)
+SCRIP_CODE_FIELD_HINTS = ('hdncode', 'hdnscrip', 'scripcode', 'hf_code')
+
+# Columns after the security-code cell, as in the scrapers' following-sibling::td[3] and td[5] XPaths
+# (the XML-only Consolidated_xml scripts take the XBRL link from td[6])
+FILE_NAME_OFFSET = 3
+LINK_OFFSET = 5
+
+POOL_SIZE = 8  # Keep-alive connections per host
+REQUEST_TIMEOUT = 30
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+}
+
+
+# Raised when the form or the listing does not look like the recorded page, so the caller can fall back to the browser
+class BsePostbackError(Exception):
+    pass
+
+
+# Function to build a keep-alive session with a connection pool and retries on transient server errors
+def make_session(pool_size=POOL_SIZE):
+    session = requests.Session()
+    retry = Retry(total=2, backoff_factor=1, status_forcelist=(502, 503, 504), allowed_methods=None)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+# Function to collect the form's current values the way a browser would submit them
+# (every named input, the selected option of every select; submit buttons are left out)
+def form_fields(form):
+    fields = {}
+    for element in form.find_all('input'):
+        name = element.get('name')
+        if not name or element.get('type', 'text').lower() in ('submit', 'button', 'image', 'reset'):
+            continue
+        if element.get('type', '').lower() in ('checkbox', 'radio') and not element.has_attr('checked'):
+            continue
+        fields[name] = element.get('value', '')
+    for select in form.find_all('select'):
+        name = select.get('name')
+        if not name:
+            continue
+        option = select.find('option', selected=True) or select.find('option')
+        fields[name] = option.get('value', option.get_text(strip=True)) if option else ''
+    return fields
+
+
+def _element_name(form, element_id):
+    element = form.find(id=element_id)
+    if element is None or not element.get('name'):
+        raise BsePostbackError(f"Element '{element_id}' not found on the results page")
+    return element['name']
+
+
+# Function to find a filing URL in an anchor: a plain href, or the URL inside a window.open(...) handler
+def link_url(anchor, base_url):
+    href = anchor.get('href', '')
+    if href and not href.lower().startswith('javascript') and href != '#':
+        return urljoin(base_url, href)
+    handler = href + ' ' + anchor.get('onclick', '')
+    match = re.search(r"""['"]((?:https?://|/)[^'"]+)['"]""", handler)
+    return urljoin(base_url, match.group(1)) if match else None
+
+
+# Function to pull (file name, filing URL) pairs for a security code out of the results listing
+def parse_listing(html, security_code, base_url, link_offset=LINK_OFFSET):
+    soup = BeautifulSoup(html, 'html.parser')
+    filings = []
+    for row in soup.find_all('tr'):
+        cells = row.find_all('td', recursive=False)
+        for i, cell in enumerate(cells):
+            if cell.get_text(strip=True) != security_code or i + link_offset >= len(cells):
+                continue
+            name_anchor = cells[i + FILE_NAME_OFFSET].find('a')
+            link_anchor = cells[i + link_offset].find('a')
+            if name_anchor is None or link_anchor is None:
+                continue
+            url = link_url(link_anchor, base_url)
+            if url:
+                filings.append((name_anchor.get_text(strip=True), url))
+            break
+    return filings
+
+
+# Keeps one pooled session per fetcher; use one fetcher per worker thread
+class BseHttpFetcher:
+    def __init__(self, results_url=RESULTS_URL, session=None, timeout=REQUEST_TIMEOUT, link_offset=LINK_OFFSET):
+        self.results_url = results_url
+        self.link_offset = link_offset
+        self.session = session or make_session()
+        self.timeout = timeout
+
+    def _get(self, url, **kwargs):
+        response = self.session.get(url, timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    # Function to replay search -> suggestion -> dropdown -> Submit as one postback and return the listing
+    def list_filings(self, security_code):
+        page = self._get(self.results_url)
+        form = BeautifulSoup(page.text, 'html.parser').find('form')
+        if form is None or form.find('input', attrs={'name': '__VIEWSTATE'}) is None:
+            raise BsePostbackError("Results page has no ASP.NET form with a __VIEWSTATE")
+
+        fields = form_fields(form)
+        fields[_element_name(form, SEARCH_BOX_ID)] = security_code
+        fields[_element_name(form, BROADCAST_DROPDOWN_ID)] = BROADCAST_VALUE
+        for name in list(fields):
+            element = form.find(attrs={'name': name})
+            identity = f"{name} {element.get('id', '') if element else ''}".lower()
+            if any(hint in identity for hint in SCRIP_CODE_FIELD_HINTS):
+                fields[name] = security_code
+        submit = form.find(id=SUBMIT_BUTTON_ID)
+        if submit is None or not submit.get('name'):
+            raise BsePostbackError(f"Element '{SUBMIT_BUTTON_ID}' not found on the results page")
+        fields[submit['name']] = submit.get('value', 'Submit')
+        fields['__EVENTTARGET'] = ''
+        fields['__EVENTARGUMENT'] = ''
+
+        action = urljoin(page.url, form.get('action') or page.url)
+        listing = self.session.post(action, data=fields, timeout=self.timeout, headers={'Referer': page.url})
+        listing.raise_for_status()
+        return parse_listing(listing.text, security_code, listing.url, self.link_offset)
+
+    # Function to download one filing; returns (extension, content) for iXBRL (.html) or XBRL (.xml)
+    def fetch_document(self, url):
+        response = self._get(url, headers={'Referer': self.results_url})
+        response.encoding = response.encoding or 'utf-8'
+        content = response.text
+        if '<ix:header>' in content:
+            return 'html', content
+        if content.lstrip().startswith('<?xml') or '<xbrl' in content[:2000]:
+            return 'xml', content
+        raise BsePostbackError(f"Unexpected content at {url} (neither iXBRL nor XBRL)")
+
+    # Function to save every filing of a company as {stock_name}_{file_name}.html/.xml, like the browser scrapers
+    # Returns (results, failed): one (file name, url, status, error line) tuple per filing saved or skipped, and one
+    # (file name, url, error line) tuple per filing whose download failed, for the caller to replay in the browser;
+    # None when the postback failed and the whole company falls back to the browser
+    # Filings already in `manifest` are not downloaded again
+    def save_filings(self, security_code, stock_name, save_folder, manifest=None):
+        try:
+            filings = self.list_filings(security_code)
+        except (requests.RequestException, BsePostbackError) as e:
+            print(f"HTTP listing failed for {stock_name}: {e}")
+            return None
+        if not filings:
+            print(f"HTTP listing returned no filings for {stock_name}")
+            return None
+
+        results, failed = [], []
+        for file_name, url in filings:
+            print(file_name)
+            if manifest is not None and manifest.is_known(security_code, file_name, save_folder):
+                results.append((file_name, url, "Skipped (in manifest)", None))
+                continue
+            try:
+                extension, content = self.fetch_document(url)
+                final_file = os.path.join(save_folder, f"{stock_name}_{file_name}.{extension}")
+                with open(final_file, 'w', encoding='utf-8') as file:
+                    file.write(content)
+                if manifest is not None:
+                    manifest.record(security_code, file_name, final_file)
+                results.append((file_name, url, "Success", None))
+            except Exception as e:
+                error_line = next((line.strip() for line in traceback.format_exc().splitlines()
+                                   if 'File' in line and ', line ' in line), 'Unknown')
+                failed.append((file_name, url, error_line))
+                print(f"Error saving file for {stock_name} - {file_name} over HTTP: {str(e)}")
+        return results, failed
+
+    def close(self):
+        self.session.close()
@@ -1,35 +1,51 @@
 import os
 import time
+import queue
+import threading
 import pandas as pd
 import traceback
 from datetime import datetime
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
+from bse_http_fetcher import BseHttpFetcher
+from driver_manager import DriverManager
+from scraper_waits import (step_timer, wait_for_elements, wait_for_clickable, wait_for_new_window,
+                           wait_for_window_count, wait_for_filing, XML_VIEWER_ID)
+from filing_manifest import FilingManifest, MANIFEST_FILE_NAME
 
 SAMPLE_LIST = r"D:\\FinancialStatementAnalysis\\03input\\Samples500_v2.xlsx"
 SAVE_BASE_PATH = r"D:\FinancialStatementAnalysis\test1"
 LOG_PATH = SAVE_BASE_PATH
 MAX_RETRIES = 5
+POOL_SIZE = 4  # Companies processed in parallel, each worker with its own Chrome session and HTTP session
+USE_HTTP_FETCHER = True  # Replay the results-page postback over HTTP; Chrome is only started for companies where that fails
+FORCE_REFRESH = set()  # Security codes (as text) whose filings are fetched again even when the manifest has them
 
 options = Options()
 options.add_argument("--start-maximized")
 options.add_argument("--headless")  # Comment to see browser actions
 
 log_data = []
+log_lock = threading.Lock()
 
+# Filings saved by earlier runs, kept in SAVE_BASE_PATH; set in main()
+filing_manifest = None
+
+# Workers share one log; each entry records the worker thread that wrote it
 def log_message(stock_name, file_name, url, status, error_line=None):
-    log_data.append({
-        "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "Stock Name": stock_name,
-        "File Name": file_name,
-        "URL": url,
-        "Status": status,
-        "Error Line": error_line
-    })
+    with log_lock:
+        log_data.append({
+            "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "Worker": threading.current_thread().name,
+            "Stock Name": stock_name,
+            "File Name": file_name,
+            "URL": url,
+            "Status": status,
+            "Error Line": error_line
+        })
 
 def get_error_line():
     tb_str = traceback.format_exc()
@@ -39,10 +55,25 @@ def get_error_line():
     return 'Unknown'
 
 # ----------------------------- Extraction Logic -----------------------------
-def XML_extraction_with_retry(driver, security_code, stock_name, save_folder):
+# Returns the file names still to fetch in the browser: None for every filing (the listing failed),
+# otherwise the filings whose download failed (empty when all were saved)
+def HTTP_extraction(http_fetcher, security_code, stock_name, save_folder):
+    outcome = http_fetcher.save_filings(security_code, stock_name, save_folder, filing_manifest)
+    if outcome is None:
+        print(f"Falling back to the browser for {stock_name}")
+        return None
+    results, failed = outcome
+    for file_name, url, status, error_line in results:
+        log_message(stock_name, file_name, url, status, error_line)
+    if failed:
+        print(f"Falling back to the browser for {len(failed)} filing(s) of {stock_name}")
+    return {file_name for file_name, url, error_line in failed}
+
+# `only` limits the browser to the named filings (the ones the HTTP fetcher could not download)
+def XML_extraction_with_retry(driver_manager, security_code, stock_name, save_folder, only=None):
     for retry_count in range(1, MAX_RETRIES + 1):
         print(f"Attempt {retry_count} for {stock_name}")
-        if XML_extraction(driver, security_code, stock_name, save_folder):
+        if XML_extraction(driver_manager, security_code, stock_name, save_folder, only):
             return True
         wait_time = 2 ** retry_count
         print(f"Retry {retry_count} for {stock_name} failed. Retrying in {wait_time} seconds...")
@@ -50,10 +81,13 @@ def XML_extraction_with_retry(driver, security_code, stock_name, save_folder):
     print(f"All {MAX_RETRIES} attempts failed for {stock_name}. Moving to the next company.")
     return False
 
-def XML_extraction(driver, security_code, stock_name, save_folder):
+def XML_extraction(driver_manager, security_code, stock_name, save_folder, only=None):
     Top_URL = "https://www.bseindia.com/corporates/Comp_Resultsnew.aspx"
     try:
-        driver.get(Top_URL)
+        driver = driver_manager.get()
+        with step_timer.step('results_page'):
+            driver.get(Top_URL)
+        driver_manager.record_pages()
 
         Security_Search = WebDriverWait(driver, 10).until(
             EC.visibility_of_element_located((By.ID, "ContentPlaceHolder1_SmartSearch_smartSearch"))
@@ -69,37 +103,38 @@ def XML_extraction(driver, security_code, stock_name, save_folder):
 
         driver.find_element(By.ID, "ContentPlaceHolder1_btnSubmit").click()
 
-        rows = driver.find_elements(By.XPATH, f"//td[text()='{security_code}']/following-sibling::td[5]//a")
+        rows = wait_for_elements(driver, f"//td[text()='{security_code}']/following-sibling::td[5]//a")
         file_name_rows = driver.find_elements(By.XPATH, f"//td[text()='{security_code}']/following-sibling::td[3]//a")
-
-        time.sleep(1)
         main_window = driver.current_window_handle
 
         for i, link in enumerate(rows):
             file_name = file_name_rows[i].text
             print(file_name)
-            time.sleep(1)
+            if only is not None and file_name not in only:
+                continue
+            if filing_manifest is not None and filing_manifest.is_known(security_code, file_name, save_folder):
+                log_message(stock_name, file_name, Top_URL, "Skipped (in manifest)")
+                continue
 
+            wait_for_clickable(driver, link)
             driver.execute_script("arguments[0].click();", link)
-            WebDriverWait(driver, 10).until(lambda d: len(d.window_handles) > 1)
-            driver.switch_to.window(driver.window_handles[-1])
-            time.sleep(2)
-            page_content = driver.page_source
+            driver.switch_to.window(wait_for_new_window(driver, 1))
+            driver_manager.record_pages()
 
             try:
-                if '<ix:header>' in page_content:
+                if wait_for_filing(driver) == 'html':
                     final_file = os.path.join(save_folder, f"{stock_name}_{file_name}.html")
                     with open(final_file, 'w', encoding='utf-8') as file:
-                        file.write(page_content)
+                        file.write(driver.page_source)
                 else:
-                    xml_div = WebDriverWait(driver, 5).until(
-                        EC.presence_of_element_located((By.ID, 'webkit-xml-viewer-source-xml'))
-                    )
+                    xml_div = driver.find_element(By.ID, XML_VIEWER_ID)
                     xml_content = xml_div.get_attribute('innerHTML')
                     final_file = os.path.join(save_folder, f"{stock_name}_{file_name}.xml")
                     with open(final_file, 'w', encoding='utf-8') as file:
                         file.write(xml_content)
 
+                if filing_manifest is not None:
+                    filing_manifest.record(security_code, file_name, final_file)
                 log_message(stock_name, file_name, driver.current_url, "Success")
 
             except Exception as e:
@@ -107,8 +142,8 @@ def XML_extraction(driver, security_code, stock_name, save_folder):
                 print(f"Error saving file for {stock_name} - {file_name}: {str(e)}")
 
             driver.close()
+            wait_for_window_count(driver, 1)
             driver.switch_to.window(main_window)
-            time.sleep(1)
     
         return True
     
@@ -117,8 +152,56 @@ def XML_extraction(driver, security_code, stock_name, save_folder):
         print(f"Error during extraction for {stock_name}: {str(e)}")
         return False
 
+# ----------------------------- Worker Pool -----------------------------
+# Each worker pulls companies off the shared queue until it is empty; its browser is only started on first fallback
+# and is then reused across companies, recycled and replaced by the worker's DriverManager
+def extraction_worker(tasks, stats):
+    http_fetcher = BseHttpFetcher() if USE_HTTP_FETCHER else None
+    driver_manager = DriverManager(options)
+    started = time.perf_counter()
+    try:
+        while True:
+            try:
+                security_code, stock_name, save_folder = tasks.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                pending = HTTP_extraction(http_fetcher, security_code, stock_name, save_folder) if http_fetcher is not None else None
+                if pending is None:
+                    success = XML_extraction_with_retry(driver_manager, security_code, stock_name, save_folder)
+                elif pending:
+                    success = XML_extraction_with_retry(driver_manager, security_code, stock_name, save_folder, pending)
+                else:
+                    success = True
+            except Exception as e:
+                log_message(stock_name, "N/A", "N/A", "Extraction Failed", get_error_line())
+                print(f"Worker error for {stock_name}: {str(e)}")
+                success = False
+            stats["Companies"] += 1
+            stats["Failed"] += not success
+            if filing_manifest is not None:
+                filing_manifest.save()
+    finally:
+        driver_manager.quit()
+        if http_fetcher is not None:
+            http_fetcher.close()
+        stats["Seconds"] = time.perf_counter() - started
+        stats["Browser"] = driver_manager.describe()
+
+def report_throughput(worker_stats, log_df):
+    saved = log_df[log_df["Status"] == "Success"].groupby("Worker").size() if not log_df.empty else pd.Series(dtype=int)
+    print("Worker throughput:")
+    for worker, stats in worker_stats.items():
+        minutes = max(stats["Seconds"], 1e-9) / 60
+        print(f"  {worker}: {stats['Companies']} companies ({stats['Failed']} failed), "
+              f"{int(saved.get(worker, 0))} filings in {stats['Seconds']:.0f}s "
+              f"-> {stats['Companies'] / minutes:.1f} companies/min; {stats['Browser']}")
+    total_companies = sum(stats["Companies"] for stats in worker_stats.values())
+    print(f"  Total: {total_companies} companies, {int(saved.sum())} filings")
+
 # ----------------------------- Main Execution -----------------------------
 def main():
+    global filing_manifest
     df = pd.read_excel(SAMPLE_LIST, sheet_name='Sheet1')
     start_row = int(input("Enter the start row number (e.g., 10): "))
     end_row = int(input("Enter the end row number (e.g., 20): "))
@@ -129,21 +212,30 @@ def main():
 
     df_range = df.iloc[start_row - 1:end_row]
 
-    driver = webdriver.Chrome(options=options)
-    try:
-        for index, row in df_range.iterrows():
-            security_code = str(row['Security Code'])
-            stock_name = str(row['Symbol'])
-            folder_name = f"{index+1}_{stock_name}"
-            save_folder = os.path.join(SAVE_BASE_PATH, folder_name)
-            os.makedirs(save_folder, exist_ok=True)
-
-            XML_extraction_with_retry(driver, security_code, stock_name, save_folder)
-
-    finally:
-        driver.quit()
-
-    log_df = pd.DataFrame(log_data)
+    os.makedirs(SAVE_BASE_PATH, exist_ok=True)
+    filing_manifest = FilingManifest(os.path.join(SAVE_BASE_PATH, MANIFEST_FILE_NAME), FORCE_REFRESH)
+
+    tasks = queue.Queue()
+    for index, row in df_range.iterrows():
+        security_code = str(row['Security Code'])
+        stock_name = str(row['Symbol'])
+        folder_name = f"{index+1}_{stock_name}"
+        save_folder = os.path.join(SAVE_BASE_PATH, folder_name)
+        os.makedirs(save_folder, exist_ok=True)
+        tasks.put((security_code, stock_name, save_folder))
+
+    pool_size = max(1, min(POOL_SIZE, tasks.qsize()))
+    worker_stats = {f"worker-{i + 1}": {"Companies": 0, "Failed": 0, "Seconds": 0.0, "Browser": ""} for i in range(pool_size)}
+    workers = [threading.Thread(target=extraction_worker, args=(tasks, stats), name=name)
+               for name, stats in worker_stats.items()]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    log_df = pd.DataFrame(log_data, columns=["Timestamp", "Worker", "Stock Name", "File Name", "URL", "Status", "Error Line"])
+    report_throughput(worker_stats, log_df)
+    step_timer.report()
     log_file = os.path.join(LOG_PATH, f"log_rows_{start_row}_to_{end_row}.xlsx")
     log_df.to_excel(log_file, index=False)
     print("Process complete")
@@ -0,0 +1,128 @@
+## Vectorized split- and dividend-adjustment of OHLCV from the Dividends and Stock Split columns
+import numpy as np
+import pandas as pd
+from sqlalchemy import text, inspect
+from pg_copy import quote_ident
+from pg_upsert import upsert_dataframe
+
+# Adjusted series written next to the raw ones
+ADJUSTED_COLUMNS = ['Adj Open', 'Adj High', 'Adj Low', 'Adj Close', 'Adj Volume', 'Adj Factor']
+
+# Column types used when an existing price table is migrated to hold the adjusted series
+ADJUSTED_COLUMN_TYPES = {'Adj Open': 'DOUBLE PRECISION', 'Adj High': 'DOUBLE PRECISION', 'Adj Low': 'DOUBLE PRECISION',
+                         'Adj Close': 'DOUBLE PRECISION', 'Adj Volume': 'BIGINT', 'Adj Factor': 'DOUBLE PRECISION'}
+
+# Yahoo's unadjusted OHLC (auto_adjust=False) already has splits applied; set False for truly raw prices
+SPLITS_ALREADY_APPLIED = True
+
+
+def _split_column(data):
+    return 'Stock Split' if 'Stock Split' in data.columns else 'Stock Splits'
+
+
+# Function to compute per-row price and volume factors for a frame sorted by Symbol, Date
+# An action on row i adjusts every earlier row of the same symbol, so each row's factor is the
+# product of the event factors of all later rows; done with one reverse cumulative sum of logs
+def adjustment_factors(symbols, closes, dividends, splits, splits_already_applied=SPLITS_ALREADY_APPLIED):
+    n = len(symbols)
+    group_start = np.ones(n, dtype=bool)
+    group_start[1:] = symbols[1:] != symbols[:-1]
+
+    previous_close = np.empty(n)
+    previous_close[0] = np.nan
+    previous_close[1:] = closes[:-1]
+    previous_close[group_start] = np.nan
+
+    # Ex-dividend day: earlier prices scale by (1 - dividend / previous close)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dividend_factor = np.where((dividends > 0) & (previous_close > dividends), 1 - dividends / previous_close, 1.0)
+    # Split day with ratio r: earlier prices divide by r, earlier volumes multiply by r
+    split_factor = np.where(splits > 0, 1.0 / np.where(splits > 0, splits, 1.0), 1.0)
+
+    log_split = np.log(split_factor)
+    log_price = np.log(dividend_factor) + (0.0 if splits_already_applied else log_split)
+
+    group_id = np.cumsum(group_start) - 1
+    group_end = np.append(np.flatnonzero(group_start)[1:], n)[group_id]  # Exclusive end index of each row's group
+
+    def later_rows_sum(log_factor):
+        suffix = np.append(np.cumsum(log_factor[::-1])[::-1], 0.0)  # suffix[j] = sum of log_factor[j:]
+        return suffix[1:n + 1] - suffix[group_end]  # Sum over rows after j within the same symbol
+
+    price_factor = np.exp(later_rows_sum(log_price))
+    volume_factor = np.ones(n) if splits_already_applied else np.exp(-later_rows_sum(log_split))
+    return price_factor, volume_factor
+
+
+# Function to add adjusted OHLCV columns for every symbol in the frame at once
+def adjust_prices(data, splits_already_applied=SPLITS_ALREADY_APPLIED):
+    if data.empty:
+        return data
+
+    data = data.sort_values(['Symbol', 'Date'], ignore_index=True)
+    split_column = _split_column(data)
+    dividends = pd.to_numeric(data['Dividends'], errors='coerce').fillna(0).to_numpy(dtype='float64') if 'Dividends' in data.columns else np.zeros(len(data))
+    splits = pd.to_numeric(data[split_column], errors='coerce').fillna(0).to_numpy(dtype='float64') if split_column in data.columns else np.zeros(len(data))
+
+    price_factor, volume_factor = adjustment_factors(
+        data['Symbol'].astype(str).to_numpy(), data['Close'].to_numpy(dtype='float64'),
+        dividends, splits, splits_already_applied)
+
+    for col in ('Open', 'High', 'Low', 'Close'):
+        data[f'Adj {col}'] = data[col].to_numpy(dtype='float64') * price_factor
+    data['Adj Volume'] = np.round(data['Volume'].to_numpy(dtype='float64') * volume_factor).astype('int64')
+    data['Adj Factor'] = price_factor
+    return data
+
+
+# Function to list the symbols whose stored adjusted history is stale after writing `data`
+# An action adjusts every earlier row of its symbol, so a symbol needs a refresh when any written row is on or before
+# its latest stored dividend or split: a new action (the written rows are already stored), or a backfill of rows
+# older than an action stored earlier, which were written with factor 1
+def symbols_to_readjust(data, table_name, engine):
+    if data.empty:
+        return []
+    first_written = data.assign(Symbol=data['Symbol'].astype(str)).groupby('Symbol')['Date'].min()
+    action = " OR ".join(f"{quote_ident(col)} > 0" for col in ('Dividends', 'Stock Split'))
+    query = text(f"SELECT {quote_ident('Symbol')}, max({quote_ident('Date')}) AS {quote_ident('Last Action')} "
+                 f"FROM {quote_ident(table_name)} WHERE {quote_ident('Symbol')} = ANY(:symbols) AND ({action}) "
+                 f"GROUP BY {quote_ident('Symbol')}")
+    with engine.connect() as connection:
+        last_actions = pd.read_sql(query, connection, params={'symbols': list(first_written.index)})
+    last_action = pd.to_datetime(last_actions.set_index('Symbol')['Last Action'])
+    stale = first_written.reindex(last_action.index) <= last_action
+    return list(stale[stale].index)
+
+
+# Function to recompute the full stored adjusted history of the given symbols (see symbols_to_readjust)
+def refresh_adjusted(symbols, table_name, engine, splits_already_applied=SPLITS_ALREADY_APPLIED):
+    if not symbols:
+        return 0
+
+    query = text(f"SELECT * FROM {quote_ident(table_name)} WHERE {quote_ident('Symbol')} = ANY(:symbols)")
+    with engine.connect() as connection:
+        history = pd.read_sql(query, connection, params={'symbols': list(symbols)})
+    if history.empty:
+        return 0
+
+    adjusted = adjust_prices(history, splits_already_applied)
+    with engine.begin() as connection:
+        counts = upsert_dataframe(adjusted, table_name, connection, on_conflict='update')
+    print(f"Recomputed adjusted prices for {len(symbols)} symbol(s): {counts['updated']} rows updated.")
+    return counts['updated']
+
+
+# Function to migrate a price table created before STORE_ADJUSTED: adds any missing 'Adj *' columns
+# (NULL for the existing rows until refresh_adjusted recomputes them); no-op when the table does not exist yet
+def add_adjusted_columns(table_name, engine):
+    if not inspect(engine).has_table(table_name):
+        return []
+    existing = {column['name'] for column in inspect(engine).get_columns(table_name)}
+    missing = [col for col in ADJUSTED_COLUMNS if col not in existing]
+    if missing:
+        with engine.begin() as connection:
+            for col in missing:
+                connection.execute(text(f"ALTER TABLE {quote_ident(table_name)} "
+                                        f"ADD COLUMN IF NOT EXISTS {quote_ident(col)} {ADJUSTED_COLUMN_TYPES[col]}"))
+        print(f"Added {', '.join(missing)} to '{table_name}'.")
+    return missing
@@ -0,0 +1,162 @@
+## Nightly incremental update: fetch only the bars after each symbol's high-water mark
+import os
+import glob
+import json
+import pandas as pd
+from sqlalchemy import inspect, text
+import fetch_stock_data as pipeline
+from pg_copy import quote_ident
+from pg_upsert import ensure_unique_index
+from price_cache import load_cache, save_cache, CACHE_DIR
+from price_schema import concat_price_frames, to_sink_frame
+from symbol_master import SymbolMaster, load_symbol_master
+from suffix_resolver import SuffixResolver, SUFFIX_CACHE_FILE
+from trading_calendar import load_trading_calendar, drop_empty_windows, HOLIDAY_FILE
+from corporate_actions import refresh_adjusted, symbols_to_readjust
+from price_rollups import refresh_rollups
+from fetch_engine import AdaptiveConcurrency
+
+# The update reads its high-water marks from, and writes to, the table fetch_stock_data.py appends daily bars to:
+# pipeline.price_table() (PRICE_TABLE, or UNADJUSTED_TABLE when STORE_ADJUSTED is set)
+
+# Where the last stored date per symbol comes from: 'database' (one grouped query on the price table)
+# or 'cache' (the covered ranges in CACHE_DIR's metadata files, with company codes from SYMBOLS_FILE)
+HIGH_WATER_SOURCE = 'database'
+SYMBOLS_FILE = r"D:\yfinance\Sample_daterange (3).xlsx"
+
+
+# Function to read each symbol's company code and last stored date with one grouped query
+def database_high_water_marks(engine, table_name):
+    symbol, company_code = quote_ident('Symbol'), quote_ident('Company Code')
+    query = text(f"SELECT {symbol}, max({company_code}) AS {company_code}, max({quote_ident('Date')}) AS {quote_ident('Last Date')} "
+                 f"FROM {quote_ident(table_name)} GROUP BY {symbol}")
+    with engine.connect() as connection:
+        marks = pd.read_sql(query, connection)
+    marks['Last Date'] = pd.to_datetime(marks['Last Date']).dt.normalize()
+    return marks
+
+
+# Function to read each cached symbol's last covered date from the cache metadata (covered ranges end exclusive)
+def cache_high_water_marks(cache_dir=CACHE_DIR):
+    marks = []
+    for meta_path in glob.glob(os.path.join(cache_dir, "*.json")):
+        with open(meta_path, 'r', encoding='utf-8') as file:
+            covered = json.load(file).get('covered', [])
+        if covered:
+            last_end = max(pd.Timestamp(end) for start, end in covered)
+            marks.append({'Symbol': os.path.splitext(os.path.basename(meta_path))[0], 'Last Date': last_end.normalize() - pd.Timedelta(days=1)})
+    return pd.DataFrame(marks, columns=['Symbol', 'Last Date'])
+
+
+# Function to turn high-water marks into fetch windows from the mark itself through today (end exclusive)
+# The marked session is fetched again because a run during market hours stored a partial bar for it;
+# the upsert in run_update overwrites that bar with the final one
+def plan_updates(high_water_marks, today=None):
+    today = pd.Timestamp(today).normalize() if today is not None else pd.Timestamp.today().normalize()
+    plan = pd.DataFrame({
+        'Symbol': high_water_marks['Symbol'],
+        'Start Date': pd.to_datetime(high_water_marks['Last Date']).dt.normalize(),
+        'End Date': today + pd.Timedelta(days=1),
+    })
+    return plan[plan['Start Date'] <= today].reset_index(drop=True)
+
+
+# Function to add the new rows to the local cache and mark the updated windows as covered
+def extend_cache(frames, plan, cache_dir=CACHE_DIR):
+    today = pd.Timestamp.today().normalize()
+    start_by_symbol = dict(zip(plan['Symbol'], plan['Start Date']))
+    for data in frames:
+        symbol = str(data['Symbol'].iloc[0])
+        cached_data, covered = load_cache(symbol, cache_dir)
+        new_data = to_sink_frame(data)
+        if not cached_data.empty:
+            new_data = new_data[[col for col in cached_data.columns if col in new_data.columns]]
+        combined = pd.concat([cached_data, new_data], ignore_index=True)
+        combined = combined.drop_duplicates(subset=['Date'], keep='last').sort_values('Date', ignore_index=True)
+        # Today's bar can still change, so coverage stops at the start of today like fetch_with_cache
+        covered.append((start_by_symbol.get(symbol, new_data['Date'].min().normalize()), today))
+        save_cache(symbol, combined, covered, cache_dir)
+
+
+# Function to run the incremental update and return the number of rows written (new and re-fetched)
+def run_update(source=HIGH_WATER_SOURCE, symbols_file=SYMBOLS_FILE):
+    engine = pipeline.engine
+    table_name = pipeline.price_table()
+
+    if source == 'database':
+        high_water_marks = database_high_water_marks(engine, table_name)
+        symbol_master = SymbolMaster(high_water_marks)
+    elif source == 'cache':
+        high_water_marks = cache_high_water_marks(CACHE_DIR)
+        symbol_master = load_symbol_master(symbols_file)
+        untracked = ~high_water_marks['Symbol'].isin(list(symbol_master.code_by_symbol))
+        if untracked.any():
+            print(f"Skipping {int(untracked.sum())} cached symbol(s) missing from {symbols_file}.")
+            high_water_marks = high_water_marks[~untracked]
+    else:
+        raise ValueError(f"source must be 'database' or 'cache', got {source!r}")
+
+    if high_water_marks.empty:
+        print("No tracked symbols with stored prices; run a backfill first.")
+        return 0
+
+    # Windows without a session from the mark on (only possible for marks on a weekend or holiday) cost nothing
+    trading_calendar = load_trading_calendar(HOLIDAY_FILE)
+    update_plan = drop_empty_windows(plan_updates(high_water_marks), trading_calendar)
+    print(f"{len(high_water_marks)} tracked symbol(s), {len(update_plan)} with sessions from their high-water mark on.")
+    if update_plan.empty:
+        return 0
+
+    # The re-fetched mark session must replace the stored (possibly partial) bar: with the unique (Symbol, Date)
+    # index in place fetch_stock_data writes through the upsert, and 'update' overwrites changed rows
+    if 'postgres' in pipeline.SINKS and inspect(engine).has_table(table_name):
+        with engine.begin() as connection:
+            ensure_unique_index(table_name, connection)
+    pipeline.ON_CONFLICT = 'update'
+
+    # Symbols sharing a high-water mark share a window, so most nights this is one yf.download per BATCH_SIZE symbols
+    if pipeline.RESOLVE_SUFFIXES:
+        pipeline.suffix_resolver = SuffixResolver(SUFFIX_CACHE_FILE)
+        pipeline.suffix_resolver.apply(symbol_master)
+    # Batches and the single-symbol retries share one AIMD controller, so throttling slows both down
+    fetch_controller = AdaptiveConcurrency(pipeline.MAX_CONCURRENCY, maximum=pipeline.MAX_ADAPTIVE_CONCURRENCY)
+
+    # An empty window the calendar says traded is retried as throttling (unless the symbol is known dead)
+    def expect_data(job):
+        symbol, start_date, end_date = job[:3]
+        return trading_calendar.expects_data(start_date, end_date) and not (pipeline.suffix_resolver is not None and pipeline.suffix_resolver.is_dead(symbol))
+
+    fetched_data = pipeline.fetch_historical_data_batch(update_plan, symbol_master, pipeline.BATCH_SIZE, fetch_controller, expect_data)
+    if fetch_controller.counts:
+        print(f"Fetch metrics: {fetch_controller.describe()}")
+    if pipeline.suffix_resolver is not None:
+        pipeline.suffix_resolver.save()
+
+    if not fetched_data:
+        print("No rows fetched since the last update.")
+        return 0
+
+    new_rows = concat_price_frames(fetched_data)
+    if source == 'cache':
+        extend_cache(fetched_data, update_plan, CACHE_DIR)
+
+    # A new dividend or split changes every earlier adjusted row of that symbol; recompute only those symbols
+    if pipeline.STORE_ADJUSTED and 'postgres' in pipeline.SINKS:
+        try:
+            refresh_adjusted(symbols_to_readjust(new_rows, table_name, engine), table_name, engine)
+        except Exception as e:
+            print(f"Error refreshing adjusted prices: {e}")
+
+    # Only the current week, month and fiscal quarter (or the ones a late mark reaches back into) are rewritten
+    if pipeline.MAINTAIN_ROLLUPS:
+        try:
+            refresh_rollups(new_rows, table_name, engine if 'postgres' in pipeline.SINKS else None, pipeline.price_lake())
+        except Exception as e:
+            print(f"Error refreshing rollups: {e}")
+
+    print(f"Update complete: {len(new_rows)} rows written for {new_rows['Symbol'].nunique()} symbol(s).")
+    return len(new_rows)
+
+
+if __name__ == "__main__":
+    run_update()
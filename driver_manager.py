@@ -0,0 +1,106 @@
+## Reusable Chrome sessions for the BSE scrapers: health-checked, recycled after N pages or an RSS limit, replaced on crash
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+MAX_PAGES_PER_SESSION = 200  # Pages (results page plus each filing tab) before a session is restarted
+MAX_RSS_MB = 1500  # Restart when chromedriver and its Chrome processes use more than this; needs psutil
+PAGE_LOAD_TIMEOUT = 60  # Seconds before driver.get gives up, so a hung page fails the attempt instead of the worker
+
+
+# Function to sum the resident memory of chromedriver and every Chrome process under it, in MB (None without psutil)
+def session_rss_mb(driver):
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        processes = [root] + root.children(recursive=True)
+    except (AttributeError, psutil.Error):
+        return None
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            continue
+    return round(total / (1024 * 1024), 1)
+
+
+# Hands out one warm Chrome session at a time; use one manager per worker thread
+class DriverManager:
+    def __init__(self, options=None, max_pages=MAX_PAGES_PER_SESSION, max_rss_mb=MAX_RSS_MB, factory=None):
+        self.options = options
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.factory = factory or (lambda: webdriver.Chrome(options=self.options))
+        self.driver = None
+        self.pages = 0
+        self.sessions_started = 0
+        self.recycled = 0
+        self.replaced = 0
+
+    def _start(self):
+        self.driver = self.factory()
+        self.driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+        self.pages = 0
+        self.sessions_started += 1
+        return self.driver
+
+    # Function to check the session still answers, closing tabs a failed attempt left open
+    def _healthy(self):
+        try:
+            handles = self.driver.window_handles
+            for handle in handles[1:]:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            self.driver.switch_to.window(handles[0])
+            self.driver.execute_script("return document.readyState")
+            return True
+        except WebDriverException as e:
+            print(f"Browser session unhealthy ({type(e).__name__}); starting a new one")
+            return False
+
+    def _needs_recycle(self):
+        if self.max_pages and self.pages >= self.max_pages:
+            return f"{self.pages} pages"
+        if self.max_rss_mb:
+            rss = session_rss_mb(self.driver)
+            if rss is not None and rss > self.max_rss_mb:
+                return f"{rss} MB RSS"
+        return None
+
+    # Function to return a healthy driver: the current session, a recycled one, or a replacement for a crashed one
+    def get(self):
+        if self.driver is None:
+            return self._start()
+        if not self._healthy():
+            self.discard()
+            self.replaced += 1
+            return self._start()
+        reason = self._needs_recycle()
+        if reason:
+            print(f"Recycling browser session after {reason}")
+            self.discard()
+            self.recycled += 1
+            return self._start()
+        return self.driver
+
+    def record_pages(self, count=1):
+        self.pages += count
+
+    # Function to drop the current session without failing if Chrome already died
+    def discard(self):
+        if self.driver is None:
+            return
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+        self.driver = None
+
+    def quit(self):
+        self.discard()
+
+    def describe(self):
+        return f"{self.sessions_started} browser session(s), {self.recycled} recycled, {self.replaced} replaced after a crash"
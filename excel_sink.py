@@ -0,0 +1,70 @@
+## Streaming Excel export that stays open for a whole run and is saved once at the end
+import re
+import threading
+from openpyxl import Workbook
+from price_schema import to_sink_frame
+
+COMBINED_SHEET = "Prices"
+
+
+# Function to turn a symbol into a valid Excel sheet title (max 31 chars, no []:*?/\)
+def sheet_title(name):
+    return re.sub(r'[\[\]:*?/\\]', '_', str(name))[:31] or "Sheet"
+
+
+# Write-only workbook: rows are streamed to disk as they are appended, so memory stays constant
+# mode='combined' writes every symbol to one sheet, mode='per_symbol' gives each symbol its own sheet
+class ExcelSink:
+    def __init__(self, file_path, mode='combined'):
+        if mode not in ('combined', 'per_symbol'):
+            raise ValueError(f"mode must be 'combined' or 'per_symbol', got {mode!r}")
+        self.file_path = file_path
+        self.mode = mode
+        self.workbook = Workbook(write_only=True)
+        self.sheets = {}
+        self.headers = {}  # Column order of each sheet, fixed by the first frame written to it
+        self.rows_written = 0
+        self.lock = threading.Lock()  # Fetch workers may append from several threads
+
+    def _sheet(self, title, columns):
+        sheet = self.sheets.get(title)
+        if sheet is None:
+            sheet = self.workbook.create_sheet(title)
+            sheet.append(list(columns))
+            self.sheets[title] = sheet
+            self.headers[title] = list(columns)
+        return title
+
+    # Function to append a frame under its sheet's header; frames may order their columns differently
+    # (yf.download batches versus Ticker.history), so columns are matched by name, never by position
+    def _write_rows(self, title, data):
+        header = self.headers[title]
+        extra_columns = [col for col in data.columns if col not in header]
+        if extra_columns:
+            raise ValueError(f"Columns {extra_columns} are not in the header of sheet '{title}': {header}")
+        data = data.reindex(columns=header)
+
+        # Object dtype turns numpy scalars into Python values and NaN into None for openpyxl
+        values = to_sink_frame(data).astype(object)
+        values = values.where(values.notna(), None)
+        sheet = self.sheets[title]
+        for row in values.itertuples(index=False, name=None):
+            sheet.append(row)
+        self.rows_written += len(data)
+
+    def append(self, data):
+        if data.empty:
+            return
+        with self.lock:
+            if self.mode == 'per_symbol' and 'Symbol' in data.columns:
+                for symbol, symbol_data in data.groupby('Symbol', sort=False):
+                    self._write_rows(self._sheet(sheet_title(symbol), data.columns), symbol_data)
+            else:
+                self._write_rows(self._sheet(COMBINED_SHEET, data.columns), data)
+
+    def close(self):
+        with self.lock:
+            if not self.sheets:
+                self.workbook.create_sheet(COMBINED_SHEET).append(['Message'])
+            self.workbook.save(self.file_path)
+        print(f"Data successfully saved to Excel file '{self.file_path}' ({self.rows_written} rows).")
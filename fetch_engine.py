@@ -0,0 +1,243 @@
+## Concurrent price-fetch engine with an AIMD-controlled worker pool, token-bucket rate limiting and retries
+import asyncio
+import json
+import time
+import socket
+import urllib.error
+import urllib.request
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+# Default limits, kept below the rate at which Yahoo starts throttling
+MAX_CONCURRENCY = 8  # Requests allowed in flight at once
+REQUESTS_PER_SECOND = 4.0  # Sustained request rate
+BURST = 8  # Requests allowed back to back before the rate applies
+
+# Adaptive concurrency (AIMD): +1 slot per window of healthy responses, x DECREASE_FACTOR on throttling,
+# at most once per round trip: failures of requests sent before the last decrease count as the same congestion signal
+MIN_CONCURRENCY = 1
+MAX_ADAPTIVE_CONCURRENCY = 32  # Ceiling for controllers created by the scripts; the token bucket still caps requests/second
+DECREASE_FACTOR = 0.5
+LATENCY_TARGET = 5.0  # Seconds; slower successes hold the level instead of raising it
+METRICS_WINDOW = 50  # Recent outcomes used for the error rate and latency
+METRICS_LOG_SECONDS = 30  # How often a run prints its live metrics
+
+# Throttled, timed-out and empty-but-expected jobs are re-queued with exponential backoff
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 2.0
+
+# Outcomes that signal congestion: the controller backs off and the job is retried
+BACKOFF_OUTCOMES = {'throttled', 'timeout', 'empty'}
+
+# Yahoo chart endpoint, overridable so the engine can be pointed at stub_chart_server.py
+CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart"
+
+
+# Token bucket shared by all workers: refills at `rate` tokens/second up to `capacity`
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# Function to tell throttling (HTTP 429) and timeouts apart from other fetch errors
+def classify_error(error):
+    status = getattr(error, 'code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    message = str(error).lower()
+    if status == 429 or 'ratelimit' in type(error).__name__.lower() or 'too many requests' in message or 'rate limit' in message:
+        return 'throttled'
+    if isinstance(error, (TimeoutError, socket.timeout)) or 'timeout' in type(error).__name__.lower() or 'timed out' in message:
+        return 'timeout'
+    if isinstance(error, urllib.error.URLError) and isinstance(error.reason, (TimeoutError, socket.timeout)):
+        return 'timeout'
+    return 'error'
+
+
+# Function for fetch functions that catch their own errors: re-raise these so the engine can back off and retry
+def is_retryable_error(error):
+    return classify_error(error) in BACKOFF_OUTCOMES
+
+
+# AIMD concurrency level plus live metrics; pass one to iter_fetch_results to read them during or after a run
+class AdaptiveConcurrency:
+    def __init__(self, initial=MAX_CONCURRENCY, minimum=MIN_CONCURRENCY, maximum=MAX_ADAPTIVE_CONCURRENCY,
+                 latency_target=LATENCY_TARGET, window=METRICS_WINDOW, adaptive=True):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.latency_target = latency_target
+        self.adaptive = adaptive
+        self.outcomes = deque(maxlen=window)
+        self.latencies = deque(maxlen=window)
+        self.counts = Counter()
+        self.retries = 0
+        self.in_flight = 0
+        self.last_decrease = 0.0
+
+    @property
+    def concurrency(self):
+        return max(self.minimum, int(self.limit))
+
+    def record(self, outcome, latency):
+        self.counts[outcome] += 1
+        self.outcomes.append(outcome)
+        self.latencies.append(latency)
+        if not self.adaptive:
+            return
+
+        now = time.monotonic()
+        if outcome in BACKOFF_OUTCOMES:
+            # Only a request sent after the last decrease has seen the reduced level
+            if now - latency >= self.last_decrease:
+                self.limit = max(self.minimum, self.limit * DECREASE_FACTOR)
+                self.last_decrease = now
+        elif outcome == 'ok' and latency <= self.latency_target:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return sum(outcome != 'ok' for outcome in self.outcomes) / len(self.outcomes)
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+        return {
+            'concurrency': self.concurrency,
+            'in_flight': self.in_flight,
+            'error_rate': round(self.error_rate(), 3),
+            'p50_latency_s': round(latencies[len(latencies) // 2], 3) if latencies else None,
+            'retries': self.retries,
+            **{outcome: count for outcome, count in sorted(self.counts.items())},
+        }
+
+    def describe(self):
+        metrics = self.snapshot()
+        latency = f"{metrics['p50_latency_s']:.2f}s" if metrics['p50_latency_s'] is not None else "n/a"
+        return (f"concurrency {metrics['concurrency']}, in flight {metrics['in_flight']}, "
+                f"error rate {metrics['error_rate']:.1%}, p50 latency {latency}, retries {metrics['retries']}")
+
+
+# Function to run fetch_func(*job) for every job and yield (job, result) pairs as they complete
+# Throttled or timed-out jobs, and empty results for which expect_data(job) is true, are retried up to
+# MAX_RETRIES times with backoff; a job that keeps failing is yielded with an empty frame
+async def fetch_as_completed(jobs, fetch_func, max_concurrency=MAX_CONCURRENCY,
+                             rate=REQUESTS_PER_SECOND, burst=BURST, controller=None, expect_data=None):
+    jobs = list(jobs)
+    if controller is None:
+        controller = AdaptiveConcurrency(initial=max_concurrency, maximum=max_concurrency)
+    bucket = TokenBucket(rate, burst)
+    slots = asyncio.Condition()
+    pending = asyncio.Queue()
+    completed = asyncio.Queue()
+    for job in jobs:
+        pending.put_nowait((job, 0))
+
+    loop = asyncio.get_running_loop()
+    retry_tasks = set()
+
+    async def requeue(job, attempt):
+        await asyncio.sleep(RETRY_BASE_DELAY * 2 ** (attempt - 1))
+        await pending.put((job, attempt))
+
+    with ThreadPoolExecutor(max_workers=controller.maximum) as executor:
+        async def worker():
+            while True:
+                job, attempt = await pending.get()
+                async with slots:
+                    await slots.wait_for(lambda: controller.in_flight < controller.concurrency)
+                    controller.in_flight += 1
+                await bucket.acquire()
+
+                started = time.monotonic()
+                try:
+                    result = await loop.run_in_executor(executor, fetch_func, *job)
+                    outcome = 'empty' if result.empty and expect_data is not None and expect_data(job) else 'ok'
+                except Exception as e:
+                    result = pd.DataFrame()
+                    outcome = classify_error(e)
+                    print(f"Error fetching data for {job[0]}: {e}")
+
+                async with slots:
+                    controller.in_flight -= 1
+                    controller.record(outcome, time.monotonic() - started)
+                    slots.notify_all()
+
+                if outcome in BACKOFF_OUTCOMES and attempt < MAX_RETRIES:
+                    controller.retries += 1
+                    print(f"Re-queueing {job[0]} after a {outcome} response (retry {attempt + 1} of {MAX_RETRIES}); {controller.describe()}")
+                    task = asyncio.create_task(requeue(job, attempt + 1))
+                    retry_tasks.add(task)
+                    task.add_done_callback(retry_tasks.discard)
+                else:
+                    await completed.put((job, result))
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(controller.maximum, len(jobs)))]
+        last_report = time.monotonic()
+        try:
+            for _ in range(len(jobs)):
+                yield await completed.get()
+                if time.monotonic() - last_report >= METRICS_LOG_SECONDS:
+                    print(f"Fetch metrics: {controller.describe()}")
+                    last_report = time.monotonic()
+        finally:
+            for task in workers + list(retry_tasks):
+                task.cancel()
+            await asyncio.gather(*workers, *retry_tasks, return_exceptions=True)
+
+
+# Function for synchronous scripts: drives fetch_as_completed and yields results as they complete
+def iter_fetch_results(jobs, fetch_func, max_concurrency=MAX_CONCURRENCY,
+                       rate=REQUESTS_PER_SECOND, burst=BURST, controller=None, expect_data=None):
+    loop = asyncio.new_event_loop()
+    results = fetch_as_completed(jobs, fetch_func, max_concurrency, rate, burst, controller, expect_data)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(results.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(results.aclose())
+        loop.close()
+
+
+# Function to fetch daily bars straight from the chart endpoint (used against the stub server)
+def fetch_chart_http(symbol, start_date, end_date, base_url=CHART_URL, interval="1d", timeout=30):
+    period1 = int(pd.Timestamp(start_date).timestamp())
+    period2 = int(pd.Timestamp(end_date).timestamp())
+    url = f"{base_url}/{symbol}?period1={period1}&period2={period2}&interval={interval}&events=div,splits"
+    request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        payload = json.loads(response.read().decode('utf-8'))
+
+    result = (payload.get('chart', {}).get('result') or [None])[0]
+    if not result or not result.get('timestamp'):
+        return pd.DataFrame()
+
+    quote = result['indicators']['quote'][0]
+    data = pd.DataFrame({
+        'Date': pd.to_datetime(result['timestamp'], unit='s').normalize(),
+        'Open': quote['open'],
+        'High': quote['high'],
+        'Low': quote['low'],
+        'Close': quote['close'],
+        'Volume': quote['volume'],
+    })
+    data['Symbol'] = symbol
+    return data
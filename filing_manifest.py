@@ -0,0 +1,65 @@
+## Download manifest for the BSE filings: which filings of a company are already saved, with their hash and size
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+
+# Kept next to the company folders: {security code: {file name from the listing: {"file", "sha256", "size", "fetched_at"}}}
+MANIFEST_FILE_NAME = "filing_manifest.json"
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Shared by the scraper workers; every update happens under one lock
+class FilingManifest:
+    def __init__(self, manifest_file, force_refresh=()):
+        self.manifest_file = manifest_file
+        self.force_refresh = {str(code) for code in force_refresh}
+        self.lock = threading.Lock()
+        self.entries = {}
+
+        if manifest_file and os.path.exists(manifest_file):
+            with open(manifest_file, 'r', encoding='utf-8') as file:
+                self.entries = json.load(file)
+
+    # Function to tell whether a filing was saved before and its file is still there with the recorded size
+    # Companies in force_refresh are always fetched again
+    def is_known(self, security_code, file_name, save_folder):
+        security_code = str(security_code)
+        if security_code in self.force_refresh:
+            return False
+        with self.lock:
+            entry = self.entries.get(security_code, {}).get(file_name)
+        if entry is None:
+            return False
+        path = os.path.join(save_folder, entry['file'])
+        return os.path.isfile(path) and os.path.getsize(path) == entry['size']
+
+    # Function to record a filing just written to file_path; hashes the file as stored on disk
+    def record(self, security_code, file_name, file_path):
+        entry = {
+            'file': os.path.basename(file_path),
+            'sha256': file_sha256(file_path),
+            'size': os.path.getsize(file_path),
+            'fetched_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        with self.lock:
+            self.entries.setdefault(str(security_code), {})[file_name] = entry
+
+    def save(self):
+        if not self.manifest_file:
+            return
+        # Held while writing too, so two workers never write the temporary file at once
+        with self.lock:
+            manifest = {code: dict(sorted(filings.items())) for code, filings in sorted(self.entries.items())}
+            # Write to a temporary file first so an interrupted run never leaves a truncated manifest
+            with open(self.manifest_file + '.tmp', 'w', encoding='utf-8') as file:
+                json.dump(manifest, file, indent=2)
+            os.replace(self.manifest_file + '.tmp', self.manifest_file)
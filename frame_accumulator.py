@@ -0,0 +1,45 @@
+## Linear-time accumulation of per-symbol frames with optional flushing to a sink
+import pandas as pd
+from price_schema import concat_price_frames
+
+
+# Collects frames in a list and concatenates them once, instead of re-copying on every pd.concat
+# When flush_rows is set, buffered frames are handed to sink(frame, units) every time that many rows have built up,
+# where units lists the keys passed to add() for the frames in that chunk (e.g. for a progress journal)
+class FrameAccumulator:
+    def __init__(self, flush_rows=None, sink=None):
+        if flush_rows is not None and sink is None:
+            raise ValueError("flush_rows needs a sink to flush to")
+        self.flush_rows = flush_rows
+        self.sink = sink
+        self.frames = []
+        self.units = []
+        self.buffered_rows = 0
+        self.total_rows = 0
+        self.flushes = 0
+
+    def add(self, data, units=()):
+        if data.empty:
+            return
+        self.frames.append(data)
+        self.units.extend(units)
+        self.buffered_rows += len(data)
+        self.total_rows += len(data)
+        if self.flush_rows is not None and self.buffered_rows >= self.flush_rows:
+            self.flush()
+
+    def materialize(self):
+        if not self.frames:
+            return pd.DataFrame()
+        return concat_price_frames(self.frames)
+
+    def flush(self):
+        if not self.frames:
+            return
+        chunk, units = self.materialize(), self.units
+        self.frames = []
+        self.units = []
+        self.buffered_rows = 0
+        self.flushes += 1
+        print(f"Flushing {len(chunk)} buffered rows (flush {self.flushes}).")
+        self.sink(chunk, units)
@@ -0,0 +1,73 @@
+## Intraday bars (1m, 5m, 15m, 1h): split long ranges into provider-sized windows, each fetched as its own job
+import pandas as pd
+import yfinance as yf
+
+# Yahoo limits per interval: days returned by one request, and how far back the interval is available
+INTERVAL_LIMITS = {
+    '1m': {'window_days': 7, 'lookback_days': 29},
+    '5m': {'window_days': 30, 'lookback_days': 59},
+    '15m': {'window_days': 30, 'lookback_days': 59},
+    '1h': {'window_days': 180, 'lookback_days': 729},
+}
+
+
+def is_intraday(interval):
+    return interval in INTERVAL_LIMITS
+
+
+# Function to split [start, end) into windows Yahoo will serve for the interval
+def split_windows(start_date, end_date, interval):
+    limits = INTERVAL_LIMITS[interval]
+    now = pd.Timestamp.today().normalize()
+    start_date = max(pd.Timestamp(start_date), now - pd.Timedelta(days=limits['lookback_days']))
+    end_date = min(pd.Timestamp(end_date), now + pd.Timedelta(days=1))
+
+    windows = []
+    window_start = start_date
+    while window_start < end_date:
+        window_end = min(window_start + pd.Timedelta(days=limits['window_days']), end_date)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
+
+
+# Function to replace each Symbol/Start Date/End Date row of a fetch plan with one row per provider window
+# Every window then becomes its own job on the caller's fetch engine, under the run's rate limit and AIMD
+# controller, and is journaled on its own; rows entirely outside the lookback are dropped
+def split_plan(plan, interval):
+    rows = []
+    for row in plan.to_dict('records'):
+        windows = split_windows(row['Start Date'], row['End Date'], interval)
+        if not windows:
+            print(f"No {interval} data available for {row['Symbol']} in the provider's lookback window.")
+        rows.extend({**row, 'Start Date': window_start, 'End Date': window_end} for window_start, window_end in windows)
+    return pd.DataFrame(rows, columns=plan.columns)
+
+
+# Function to fetch one window, returning Ticker.history()'s frame; errors propagate to the caller's engine
+def fetch_intraday_window(ticker, start_date, end_date, interval):
+    return yf.Ticker(ticker).history(start=start_date, end=end_date, interval=interval)
+
+
+# Function to fetch an intraday range as one ordered, de-duplicated frame indexed like Ticker.history()
+# A window from split_plan is a single request; a longer range is fetched window by window, and a failed
+# window raises rather than leaving a hole in the merged history
+def fetch_intraday_history(ticker, start_date, end_date, interval):
+    if not is_intraday(interval):
+        raise ValueError(f"Unsupported intraday interval {interval!r}; expected one of {list(INTERVAL_LIMITS)}")
+
+    windows = split_windows(start_date, end_date, interval)
+    if not windows:
+        print(f"No {interval} data available for {ticker} in the provider's lookback window.")
+        return pd.DataFrame()
+
+    frames = [fetch_intraday_window(ticker, window_start, window_end, interval) for window_start, window_end in windows]
+    frames = [data for data in frames if not data.empty]
+    if not frames:
+        return pd.DataFrame()
+
+    # Windows may overlap at their edges
+    data = pd.concat(frames)
+    data = data[~data.index.duplicated(keep='last')].sort_index()
+    data.index.name = 'Datetime'
+    return data
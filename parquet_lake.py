@@ -0,0 +1,133 @@
+## Hive-partitioned Parquet price lake (Symbol=<symbol>/year=<year>/) as an alternative sink to Excel and Postgres
+import os
+import sys
+import glob
+import time
+import uuid
+from urllib.parse import quote
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from price_schema import to_sink_frame
+
+LAKE_DIR = "price_lake"
+
+# Explicit partition types, so numeric-looking symbols are not read back as integers
+PARTITIONING = ds.partitioning(pa.schema([('Symbol', pa.string()), ('year', pa.int32())]), flavor='hive')
+
+# Partitions with at least this many files are rewritten as one file by compact_lake
+COMPACT_MIN_FILES = 4
+
+# Write sequence stored with every row (nanoseconds since the epoch at write time); when a (Symbol, Date)
+# was appended more than once, the copy with the highest sequence wins on read and compaction
+# (dataset scan order follows file names, not write order, so it cannot be relied on)
+WRITE_SEQ_COLUMN = 'Written At'
+
+
+# Function to keep only the newest copy of each key, using the write sequence (rows without one count as oldest)
+def _latest_rows(data, key_columns):
+    if WRITE_SEQ_COLUMN not in data.columns:
+        return data.drop_duplicates(subset=key_columns, keep='last')
+    sequence = data[WRITE_SEQ_COLUMN].fillna(0)
+    order = sequence.sort_values(kind='stable').index
+    return data.loc[order].drop_duplicates(subset=key_columns, keep='last')
+
+
+# Function to append price rows to the lake; every call writes new, time-ordered file names
+def write_prices(data, root=LAKE_DIR):
+    if data.empty:
+        return 0
+
+    write_seq = time.time_ns()
+    data = to_sink_frame(data, widen_floats=False)
+    data['Symbol'] = data['Symbol'].astype(str)
+    data['year'] = data['Date'].dt.year.astype('int32')
+    data[WRITE_SEQ_COLUMN] = pd.Series(write_seq, index=data.index, dtype='int64')
+
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    ds.write_dataset(table, root, format='parquet', partitioning=PARTITIONING,
+                     basename_template=f"part-{write_seq:020d}-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+                     existing_data_behavior='overwrite_or_ignore')
+    print(f"Data successfully saved to Parquet lake '{root}' ({len(data)} rows).")
+    return len(data)
+
+
+# Function to merge the small files of each partition into one, keeping the latest copy of each Date
+def compact_lake(root=LAKE_DIR, symbols=None, min_files=COMPACT_MIN_FILES):
+    compacted = 0
+    if symbols:
+        # Partition folder names are URI-encoded by pyarrow (M&M -> Symbol=M%26M)
+        symbol_dirs = [os.path.join(root, f"Symbol={quote(str(symbol), safe='')}") for symbol in symbols]
+    else:
+        symbol_dirs = glob.glob(os.path.join(root, "Symbol=*"))
+
+    for symbol_dir in symbol_dirs:
+        for year_dir in sorted(glob.glob(os.path.join(symbol_dir, "year=*"))):
+            files = sorted(glob.glob(os.path.join(year_dir, "*.parquet")), key=os.path.getmtime)
+            if len(files) < min_files:
+                continue
+
+            # The write sequence is kept, so rows appended after this compaction still win over these
+            data = pd.concat([pq.read_table(file).to_pandas() for file in files], ignore_index=True)
+            data = _latest_rows(data, ['Date']).sort_values('Date', ignore_index=True)
+            if WRITE_SEQ_COLUMN in data.columns:
+                data[WRITE_SEQ_COLUMN] = data[WRITE_SEQ_COLUMN].fillna(0).astype('int64')
+
+            compacted_file = os.path.join(year_dir, f"part-{time.time_ns():020d}-compacted-{uuid.uuid4().hex[:8]}.parquet")
+            pq.write_table(pa.Table.from_pandas(data, preserve_index=False), compacted_file + ".tmp")
+            os.replace(compacted_file + ".tmp", compacted_file)
+            for file in files:
+                os.remove(file)
+            compacted += 1
+
+    print(f"Compacted {compacted} partition(s) in '{root}'.")
+    return compacted
+
+
+# Function to read prices with symbol and date-range predicates pushed down to partitions and row groups
+def read_prices(root=LAKE_DIR, symbols=None, start_date=None, end_date=None, columns=None):
+    if not os.path.isdir(root):
+        return pd.DataFrame()
+
+    dataset = ds.dataset(root, format='parquet', partitioning=PARTITIONING)
+    if WRITE_SEQ_COLUMN not in dataset.schema.names:
+        # The schema is taken from one file; lakes written before the sequence column need every file's schema
+        schema = pa.unify_schemas([fragment.physical_schema for fragment in dataset.get_fragments()])
+        if WRITE_SEQ_COLUMN in schema.names:
+            dataset = ds.dataset(root, format='parquet', partitioning=PARTITIONING,
+                                 schema=pa.unify_schemas([schema, PARTITIONING.schema]))
+    has_sequence = WRITE_SEQ_COLUMN in dataset.schema.names
+    if columns is not None and has_sequence and WRITE_SEQ_COLUMN not in columns:
+        columns = list(columns) + [WRITE_SEQ_COLUMN]
+    conditions = []
+    if symbols:
+        conditions.append(ds.field('Symbol').isin([str(symbol) for symbol in symbols]))
+    if start_date is not None:
+        start_date = pd.Timestamp(start_date)
+        conditions.append(ds.field('year') >= start_date.year)
+        conditions.append(ds.field('Date') >= pa.scalar(start_date.to_pydatetime(), type=pa.timestamp('us')))
+    if end_date is not None:
+        end_date = pd.Timestamp(end_date)
+        conditions.append(ds.field('year') <= end_date.year)
+        conditions.append(ds.field('Date') < pa.scalar(end_date.to_pydatetime(), type=pa.timestamp('us')))
+
+    condition = None
+    for item in conditions:
+        condition = item if condition is None else condition & item
+
+    data = dataset.to_table(filter=condition, columns=columns).to_pandas()
+    if 'year' in data.columns:
+        data = data.drop(columns=['year'])
+    sort_columns = [col for col in ('Symbol', 'Date') if col in data.columns]
+    if sort_columns == ['Symbol', 'Date']:
+        # Rows re-appended before the next compaction are only returned once, newest write first
+        data = _latest_rows(data, sort_columns)
+    if WRITE_SEQ_COLUMN in data.columns:
+        data = data.drop(columns=[WRITE_SEQ_COLUMN])
+    return data.sort_values(sort_columns, ignore_index=True) if sort_columns else data.reset_index(drop=True)
+
+
+# Usage: python parquet_lake.py [lake root] [symbol ...] -- compacts every partition, or only the given symbols
+if __name__ == "__main__":
+    compact_lake(sys.argv[1] if len(sys.argv) > 1 else LAKE_DIR, sys.argv[2:] or None)
@@ -0,0 +1,69 @@
+## Bulk loader that streams DataFrames into PostgreSQL with COPY FROM STDIN
+import io
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from price_schema import to_sink_frame, sql_dtypes
+
+
+# Function to quote a table or column name for PostgreSQL (keeps "Company Code" etc. intact)
+def quote_ident(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+# Tables already known to exist, so the catalog is only queried once per table
+_existing_tables = set()
+
+
+# Function to create the target table from the frame's columns if it does not exist yet
+def ensure_table(data, table_name, engine):
+    key = (str(engine.url), table_name)
+    if key in _existing_tables:
+        return
+    if not inspect(engine).has_table(table_name):
+        to_sink_frame(data.head(0)).to_sql(table_name, engine, index=False, dtype=sql_dtypes(data))
+    _existing_tables.add(key)
+
+
+# Function to forget a table dropped behind ensure_table's back, so the next call creates it again
+def forget_table(table_name, engine):
+    _existing_tables.discard((str(engine.url), table_name))
+
+
+# Function to run COPY FROM STDIN on a DB-API cursor: copy_expert on psycopg2, cursor.copy on psycopg 3
+# (SQLAlchemy 2.1 resolves a plain postgresql:// URI to psycopg 3)
+def _copy_from_buffer(cursor, copy_sql, buffer):
+    if hasattr(cursor, 'copy_expert'):
+        cursor.copy_expert(copy_sql, buffer)
+    else:
+        with cursor.copy(copy_sql) as copy:
+            copy.write(buffer.getvalue())
+
+
+# Function to stream a DataFrame into an existing table using COPY over an in-memory CSV buffer
+# `connectable` is either an Engine (own transaction) or a Connection inside the caller's transaction
+def copy_dataframe(data, table_name, connectable, columns=None):
+    columns = list(columns) if columns is not None else list(data.columns)
+
+    buffer = io.StringIO()
+    to_sink_frame(data[columns]).to_csv(buffer, index=False, header=False)  # NaN/None become empty fields, which CSV COPY reads as NULL
+    buffer.seek(0)
+
+    column_list = ", ".join(quote_ident(col) for col in columns)
+    copy_sql = f"COPY {quote_ident(table_name)} ({column_list}) FROM STDIN WITH (FORMAT csv)"
+
+    if isinstance(connectable, Engine):
+        raw_connection = connectable.raw_connection()
+        try:
+            with raw_connection.cursor() as cursor:
+                _copy_from_buffer(cursor, copy_sql, buffer)
+            raw_connection.commit()
+        except Exception:
+            raw_connection.rollback()
+            raise
+        finally:
+            raw_connection.close()
+    else:
+        with connectable.connection.cursor() as cursor:
+            _copy_from_buffer(cursor, copy_sql, buffer)
+
+    return len(data)
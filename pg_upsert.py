@@ -0,0 +1,128 @@
+## Server-side dedup: stage new rows and INSERT ... ON CONFLICT against a unique (Symbol, Date) index
+import sys
+from sqlalchemy import create_engine, inspect, text
+from pg_copy import copy_dataframe, ensure_table, quote_ident
+
+# Columns that identify one price row
+KEY_COLUMNS = ['Symbol', 'Date']
+
+
+# Tables known to carry a unique index on their key columns, so the catalog is only queried once per table
+_indexed_tables = set()
+
+
+# Function to tell whether the table has a unique index or constraint on exactly the key columns
+# `connectable` is an Engine or a Connection
+def has_unique_index(table_name, connectable, key_columns=KEY_COLUMNS):
+    engine = getattr(connectable, 'engine', connectable)
+    key = (str(engine.url), table_name, tuple(key_columns))
+    if key in _indexed_tables:
+        return True
+    inspector = inspect(connectable)
+    if not inspector.has_table(table_name):
+        return False
+    unique_keys = [index['column_names'] for index in inspector.get_indexes(table_name) if index.get('unique')]
+    unique_keys += [constraint['column_names'] for constraint in inspector.get_unique_constraints(table_name)]
+    if any(set(columns) == set(key_columns) for columns in unique_keys):
+        _indexed_tables.add(key)
+        return True
+    return False
+
+
+# Function to list up to `limit` keys that occur more than once, with their number of copies
+def duplicate_keys(table_name, connection, key_columns=KEY_COLUMNS, limit=10):
+    key_list = ", ".join(quote_ident(col) for col in key_columns)
+    result = connection.execute(text(f"SELECT {key_list}, count(*) AS copies FROM {quote_ident(table_name)} "
+                                     f"GROUP BY {key_list} HAVING count(*) > 1 ORDER BY {key_list} LIMIT {int(limit)}"))
+    return [tuple(row) for row in result]
+
+
+# Function to delete duplicate keys so the unique index can be built on a table that was appended to without one
+# Each key keeps the copy with the largest Volume (a final daily bar carries the whole session's volume, a partial
+# one less), then the largest remaining values, so the kept row never depends on physical row order; returns rows removed
+def deduplicate_table(table_name, connection, key_columns=KEY_COLUMNS):
+    columns = [column['name'] for column in inspect(connection).get_columns(table_name)]
+    value_columns = sorted((col for col in columns if col not in key_columns), key=lambda col: col != 'Volume')
+    order = ", ".join(f"{quote_ident(col)} DESC NULLS LAST" for col in value_columns) or "ctid"
+    key_list = ", ".join(quote_ident(col) for col in key_columns)
+    table = quote_ident(table_name)
+    result = connection.execute(text(
+        f"DELETE FROM {table} WHERE ctid IN (SELECT ctid FROM (SELECT ctid, row_number() OVER "
+        f"(PARTITION BY {key_list} ORDER BY {order}) AS copy FROM {table}) AS ranked WHERE copy > 1)"))
+    return result.rowcount
+
+
+# Function to create the unique index the ON CONFLICT clause relies on (no-op when it already exists)
+# A table that plain appends left with duplicate keys is only cleaned up with deduplicate=True
+# (or `python pg_upsert.py <database URI> <table>`); otherwise this fails and lists some of the duplicates
+def ensure_unique_index(table_name, connection, key_columns=KEY_COLUMNS, deduplicate=False):
+    if has_unique_index(table_name, connection, key_columns):
+        return
+    duplicates = duplicate_keys(table_name, connection, key_columns)
+    if duplicates and not deduplicate:
+        raise ValueError(f"Cannot add a unique {tuple(key_columns)} index to '{table_name}': duplicate keys such as "
+                         f"{duplicates} (key..., copies). Remove them, or run `python pg_upsert.py <database URI> {table_name}` "
+                         f"to keep one copy of each.")
+    if duplicates:
+        removed = deduplicate_table(table_name, connection, key_columns)
+        print(f"Removed {removed} duplicate {tuple(key_columns)} rows from '{table_name}' before indexing it.")
+    index_name = f"{table_name}_{'_'.join(col.lower().replace(' ', '_') for col in key_columns)}_key"
+    key_list = ", ".join(quote_ident(col) for col in key_columns)
+    connection.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {quote_ident(index_name)} "
+                            f"ON {quote_ident(table_name)} ({key_list})"))
+
+
+# Function to upsert a frame through a staging table without reading existing rows into Python
+# on_conflict='nothing' keeps existing rows; 'update' overwrites them when any value changed
+# Returns a dict with the number of rows inserted, updated and skipped
+def upsert_dataframe(data, table_name, connection, on_conflict='nothing', key_columns=KEY_COLUMNS):
+    if on_conflict not in ('nothing', 'update'):
+        raise ValueError(f"on_conflict must be 'nothing' or 'update', got {on_conflict!r}")
+
+    staged_count = len(data)
+    ensure_table(data, table_name, connection.engine)
+    ensure_unique_index(table_name, connection, key_columns)
+
+    # A key may appear only once per INSERT ... ON CONFLICT statement, so keep the newest copy
+    data = data.drop_duplicates(subset=key_columns, keep='last')
+    columns = list(data.columns)
+
+    staging_table = f"{table_name}_staging"
+    connection.execute(text(f"CREATE TEMP TABLE {quote_ident(staging_table)} "
+                            f"(LIKE {quote_ident(table_name)} INCLUDING DEFAULTS) ON COMMIT DROP"))
+    copy_dataframe(data, staging_table, connection, columns)
+
+    column_list = ", ".join(quote_ident(col) for col in columns)
+    key_list = ", ".join(quote_ident(col) for col in key_columns)
+    value_columns = [col for col in columns if col not in key_columns]
+    if on_conflict == 'update' and value_columns:
+        assignments = ", ".join(f"{quote_ident(col)} = EXCLUDED.{quote_ident(col)}" for col in value_columns)
+        current_values = ", ".join(f"{quote_ident(table_name)}.{quote_ident(col)}" for col in value_columns)
+        new_values = ", ".join(f"EXCLUDED.{quote_ident(col)}" for col in value_columns)
+        conflict_action = f"DO UPDATE SET {assignments} WHERE ({current_values}) IS DISTINCT FROM ({new_values})"
+    else:
+        conflict_action = "DO NOTHING"
+
+    # xmax = 0 only for freshly inserted tuples, which separates inserts from updates
+    result = connection.execute(text(
+        f"INSERT INTO {quote_ident(table_name)} ({column_list}) "
+        f"SELECT {column_list} FROM {quote_ident(staging_table)} "
+        f"ON CONFLICT ({key_list}) {conflict_action} "
+        f"RETURNING (xmax = 0) AS inserted"
+    ))
+    written = [row.inserted for row in result]
+    connection.execute(text(f"DROP TABLE {quote_ident(staging_table)}"))
+
+    inserted = sum(1 for flag in written if flag)
+    updated = len(written) - inserted
+    return {'inserted': inserted, 'updated': updated, 'skipped': staged_count - inserted - updated}
+
+
+# Usage: python pg_upsert.py <database URI> <table> [key column ...]
+# One-time migration: removes duplicate keys (see deduplicate_table) and creates the unique index
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit("Usage: python pg_upsert.py <database URI> <table> [key column ...]")
+    with create_engine(sys.argv[1]).begin() as connection:
+        ensure_unique_index(sys.argv[2], connection, sys.argv[3:] or KEY_COLUMNS, deduplicate=True)
+    print(f"'{sys.argv[2]}' has a unique index on {tuple(sys.argv[3:] or KEY_COLUMNS)}.")
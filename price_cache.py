@@ -0,0 +1,128 @@
+## Local per-symbol OHLCV cache so only the missing date ranges go to yfinance
+import os
+import json
+import pandas as pd
+
+# Folder holding one Parquet file (data) and one JSON file (covered ranges) per symbol
+CACHE_DIR = "price_cache"
+
+
+def _cache_paths(symbol, cache_dir):
+    data_path = os.path.join(cache_dir, f"{symbol}.parquet")
+    meta_path = os.path.join(cache_dir, f"{symbol}.json")
+    return data_path, meta_path
+
+
+# Function to merge overlapping or touching [start, end) ranges
+def merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+# Function to compute the sub-ranges of [start, end) not covered by the cache
+def missing_ranges(covered, start_date, end_date):
+    gaps = []
+    cursor = start_date
+    for covered_start, covered_end in merge_ranges(covered):
+        if covered_end <= cursor:
+            continue
+        if covered_start >= end_date:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, covered_start))
+        cursor = max(cursor, covered_end)
+    if cursor < end_date:
+        gaps.append((cursor, end_date))
+    return gaps
+
+
+# Function to load the cached rows and covered ranges for a symbol
+def load_cache(symbol, cache_dir=CACHE_DIR):
+    data_path, meta_path = _cache_paths(symbol, cache_dir)
+    if not os.path.exists(data_path) or not os.path.exists(meta_path):
+        return pd.DataFrame(), []
+
+    with open(meta_path, 'r', encoding='utf-8') as file:
+        meta = json.load(file)
+    covered = [(pd.Timestamp(start), pd.Timestamp(end)) for start, end in meta.get('covered', [])]
+    return pd.read_parquet(data_path), covered
+
+
+# Function to write the cached rows and covered ranges for a symbol
+def save_cache(symbol, data, covered, cache_dir=CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    data_path, meta_path = _cache_paths(symbol, cache_dir)
+
+    # Write to temporary files first so an interrupted run never leaves a half-written cache
+    data.to_parquet(data_path + ".tmp", index=False)
+    with open(meta_path + ".tmp", 'w', encoding='utf-8') as file:
+        json.dump({'covered': [[str(start), str(end)] for start, end in merge_ranges(covered)]}, file)
+    os.replace(data_path + ".tmp", data_path)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+# Function to fetch a symbol through the cache, calling fetch_func only for the missing ranges
+# Coverage is recorded only for ranges fetched cleanly: a range whose fetch raised, or that came back empty
+# although `expect_data(start, end)` says it should hold bars, is fetched again next time
+# The first fetch error is re-raised after the rows that did arrive are cached
+def fetch_with_cache(symbol, start_date, end_date, fetch_func, cache_dir=CACHE_DIR, expect_data=None):
+    start_date = pd.Timestamp(start_date)
+    end_date = pd.Timestamp(end_date)
+
+    try:
+        cached_data, covered = load_cache(symbol, cache_dir)
+    except Exception as e:
+        print(f"Error reading cache for {symbol}, refetching: {e}")
+        cached_data, covered = pd.DataFrame(), []
+
+    gaps = missing_ranges(covered, start_date, end_date)
+    if gaps:
+        print(f"Fetching {len(gaps)} missing range(s) for {symbol}: {[(str(s.date()), str(e.date())) for s, e in gaps]}")
+
+    # Today's bar can still change, so coverage is never recorded past the start of today
+    today = pd.Timestamp.today().normalize()
+    new_frames = []
+    errors = []
+    newly_covered = False
+    for gap_start, gap_end in gaps:
+        try:
+            gap_data = fetch_func(symbol, gap_start, gap_end)
+        except Exception as e:
+            errors.append(e)
+            continue
+        if not gap_data.empty:
+            new_frames.append(gap_data)
+        elif expect_data is not None and expect_data(gap_start, gap_end):
+            print(f"No rows for {symbol} from {gap_start.date()} to {gap_end.date()} although sessions were expected; not caching the range")
+            continue
+        if gap_start < today:
+            covered.append((gap_start, min(gap_end, today)))
+            newly_covered = True
+
+    if new_frames:
+        combined = pd.concat([cached_data] + new_frames, ignore_index=True)
+        combined = combined.drop_duplicates(subset=['Date'], keep='last').sort_values('Date', ignore_index=True)
+    else:
+        combined = cached_data
+
+    # A gap that came back empty without error is recorded too, so symbols with no rows there are not refetched
+    if new_frames or newly_covered:
+        try:
+            save_cache(symbol, combined, covered, cache_dir)
+        except Exception as e:
+            print(f"Error writing cache for {symbol}: {e}")
+
+    if errors:
+        raise errors[0]
+
+    if combined.empty:
+        return combined
+
+    # Stitch the requested window back out of cache plus new rows
+    in_range = (combined['Date'] >= start_date) & (combined['Date'] < end_date)
+    return combined[in_range].reset_index(drop=True)
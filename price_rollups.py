@@ -0,0 +1,117 @@
+## Weekly, monthly and fiscal-quarter (April-March) OHLCV rollups, refreshed only for the periods new rows touch
+import pandas as pd
+from sqlalchemy import text
+from pg_copy import quote_ident
+from pg_upsert import upsert_dataframe
+from parquet_lake import write_prices, read_prices, compact_lake, LAKE_DIR
+
+# Rollup name -> pandas period frequency; Q-MAR quarters end in June, September, December and March,
+# and are numbered within the Indian fiscal year ending in March (April 2024 falls in FY2025 Q1)
+ROLLUP_FREQUENCIES = {
+    'weekly': 'W-FRI',
+    'monthly': 'M',
+    'quarterly': 'Q-MAR',
+}
+
+# Rollup rows are keyed by symbol and period end date, like the daily table's (Symbol, Date)
+ROLLUP_KEY_COLUMNS = ['Symbol', 'Date']
+
+
+def rollup_table_name(table_name, rollup):
+    return f"{table_name}_{rollup}"
+
+
+def _period_labels(periods, freq):
+    if freq == 'Q-MAR':
+        return 'FY' + periods.dt.qyear.astype(str) + 'Q' + periods.dt.quarter.astype(str)
+    return periods.astype(str)
+
+
+# Function to aggregate daily bars into one bar per symbol and period, in one groupby
+def rollup_prices(daily, freq):
+    if daily.empty:
+        return pd.DataFrame()
+
+    daily = daily.sort_values(['Symbol', 'Date'], ignore_index=True)
+    periods = daily['Date'].dt.to_period(freq).rename('Period')
+    aggregations = {
+        'Company Code': ('Company Code', 'first'),
+        'Open': ('Open', 'first'),
+        'High': ('High', 'max'),
+        'Low': ('Low', 'min'),
+        'Close': ('Close', 'last'),
+        'Volume': ('Volume', 'sum'),
+        'Dividends': ('Dividends', 'sum'),
+        'Adj Close': ('Adj Close', 'last'),
+        'Trading Days': ('Date', 'size'),
+        'First Date': ('Date', 'min'),
+        'Last Date': ('Date', 'max'),
+    }
+    aggregations = {name: spec for name, spec in aggregations.items() if spec[0] in daily.columns}
+
+    bars = daily.groupby([daily['Symbol'], periods], sort=False, observed=True).agg(**aggregations).reset_index()
+    bars.insert(1, 'Date', bars['Period'].dt.end_time.dt.normalize())  # Period end: Friday, month end or quarter end
+    bars['Period'] = _period_labels(bars['Period'], freq)
+    return bars.sort_values(['Symbol', 'Date'], ignore_index=True)
+
+
+# Function to find, per symbol, the start of the earliest period each rollup must recompute
+def affected_starts(new_rows, freq):
+    first_new = new_rows.groupby('Symbol')['Date'].min()
+    return first_new.dt.to_period(freq).dt.start_time
+
+
+# Function to read the daily rows of the given symbols from `since` onwards, from Postgres or the Parquet lake
+def load_daily(symbols, since, table_name=None, engine=None, lake_root=LAKE_DIR):
+    if engine is not None:
+        query = text(f"SELECT * FROM {quote_ident(table_name)} "
+                     f"WHERE {quote_ident('Symbol')} = ANY(:symbols) AND {quote_ident('Date')} >= :since")
+        with engine.connect() as connection:
+            daily = pd.read_sql(query, connection, params={'symbols': list(symbols), 'since': since.to_pydatetime()})
+    else:
+        daily = read_prices(lake_root, symbols=symbols, start_date=since)
+    if not daily.empty:
+        daily['Symbol'] = daily['Symbol'].astype(str)
+        daily['Date'] = pd.to_datetime(daily['Date'])
+    return daily
+
+
+# Function to recompute only the trailing periods touched by new daily rows and upsert them into the rollups
+# Writes to '<table>_<rollup>' tables when an engine is given, otherwise to '<lake_root>_<rollup>' datasets
+def refresh_rollups(new_rows, table_name='test', engine=None, lake_root=LAKE_DIR, frequencies=ROLLUP_FREQUENCIES):
+    if new_rows.empty or 'Symbol' not in new_rows.columns:
+        return {}
+
+    new_rows = new_rows[['Symbol', 'Date']].copy()
+    new_rows['Symbol'] = new_rows['Symbol'].astype(str)
+    new_rows['Date'] = pd.to_datetime(new_rows['Date'])
+    symbols = list(pd.unique(new_rows['Symbol']))
+    starts = {rollup: affected_starts(new_rows, freq) for rollup, freq in frequencies.items()}
+
+    # One read covers every rollup: the earliest affected period start across frequencies and symbols
+    since = min(start.min() for start in starts.values())
+    daily = load_daily(symbols, since, table_name, engine, lake_root)
+    if daily.empty:
+        return {}
+
+    written = {}
+    for rollup, freq in frequencies.items():
+        # Drop rows before each symbol's own affected period, so untouched periods are not rewritten
+        symbol_start = daily['Symbol'].map(starts[rollup])
+        bars = rollup_prices(daily[daily['Date'] >= symbol_start], freq)
+        if bars.empty:
+            continue
+
+        if engine is not None:
+            with engine.begin() as connection:
+                upsert_dataframe(bars, rollup_table_name(table_name, rollup), connection, 'update', ROLLUP_KEY_COLUMNS)
+        else:
+            # Re-appended periods replace the older copy on read by write sequence; compacting the touched
+            # partitions keeps the nightly re-appends of the current period from piling up
+            write_prices(bars, f"{lake_root}_{rollup}")
+            compact_lake(f"{lake_root}_{rollup}", symbols)
+        written[rollup] = len(bars)
+
+    print(f"Refreshed rollups for {len(symbols)} symbol(s): "
+          + ", ".join(f"{rollup} {count} bars" for rollup, count in written.items()))
+    return written
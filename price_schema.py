@@ -0,0 +1,93 @@
+## Compact dtype schema for price frames, applied at fetch time and kept consistent in the sinks
+import numpy as np
+import pandas as pd
+from sqlalchemy.types import BigInteger, DateTime, Float, String
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Open', 'Adj High', 'Adj Low', 'Adj Close']
+ACTION_COLUMNS = ['Dividends', 'Stock Split', 'Stock Splits']  # Mostly zero, stored sparse
+CATEGORY_COLUMNS = ['Symbol', 'Company Code']  # Repeated on every row, stored as categories
+
+# float32 keeps ~7 significant digits, so prices below this stay exact to the paisa
+FLOAT32_PRICE_LIMIT = 100000
+
+# Column types used when a sink creates the price table
+SQL_DTYPES = {
+    'Symbol': String(32),
+    'Date': DateTime(),
+    'Open': Float(precision=24),
+    'High': Float(precision=24),
+    'Low': Float(precision=24),
+    'Close': Float(precision=24),
+    'Adj Open': Float(precision=24),
+    'Adj High': Float(precision=24),
+    'Adj Low': Float(precision=24),
+    'Adj Close': Float(precision=24),
+    'Adj Factor': Float(precision=53),
+    'Volume': BigInteger(),
+    'Adj Volume': BigInteger(),
+    'Dividends': Float(precision=24),
+    'Stock Split': Float(precision=24),
+    'Stock Splits': Float(precision=24),
+}
+
+
+# Function to convert a price frame to the compact in-memory schema
+def apply_price_schema(data):
+    if data.empty:
+        return data
+
+    for col in CATEGORY_COLUMNS:
+        if col in data.columns and not isinstance(data[col].dtype, pd.CategoricalDtype):
+            data[col] = data[col].astype('category')
+
+    price_columns = [col for col in PRICE_COLUMNS if col in data.columns]
+    if price_columns:
+        largest = np.nanmax(np.abs(data[price_columns].to_numpy(dtype='float64')), initial=0)
+        price_dtype = 'float32' if largest < FLOAT32_PRICE_LIMIT else 'float64'
+        data[price_columns] = data[price_columns].astype(price_dtype)
+
+    if 'Volume' in data.columns:
+        data['Volume'] = pd.to_numeric(data['Volume'], errors='coerce').fillna(0).astype('int64')
+
+    for col in ACTION_COLUMNS:
+        if col in data.columns and not isinstance(data[col].dtype, pd.SparseDtype):
+            values = pd.to_numeric(data[col], errors='coerce').fillna(0).astype('float32')
+            data[col] = values.astype(pd.SparseDtype('float32', 0.0))
+
+    return data
+
+
+# Function to concatenate compact frames without the categories falling back to object dtype
+def concat_price_frames(frames):
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+
+    for col in CATEGORY_COLUMNS:
+        if all(col in frame.columns and isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames):
+            categories = pd.api.types.union_categoricals([frame[col] for frame in frames]).categories
+            frames = [frame.assign(**{col: frame[col].cat.set_categories(categories)}) for frame in frames]
+
+    return pd.concat(frames, ignore_index=True)
+
+
+# Function to turn a compact frame back into plain columns for the DB, Excel and CSV writers
+# widen_floats=False keeps float32 columns for sinks with a native float32 type (Parquet)
+def to_sink_frame(data, widen_floats=True):
+    data = data.copy()
+    for col in data.columns:
+        dtype = data[col].dtype
+        if isinstance(dtype, pd.SparseDtype):
+            data[col] = data[col].sparse.to_dense()
+            dtype = data[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            data[col] = data[col].astype(dtype.categories.dtype)
+        elif dtype == 'float32' and widen_floats:
+            # Widen through the shortest decimal form so 12345.67 is written as 12345.67, not 12345.669921875
+            data[col] = data[col].astype(str).astype('float64')
+    return data
+
+
+# Function to pick SQL column types for a frame from the schema (other columns follow pandas' defaults)
+def sql_dtypes(data):
+    return {col: SQL_DTYPES[col] for col in data.columns if col in SQL_DTYPES}
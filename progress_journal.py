@@ -0,0 +1,80 @@
+## Append-only journal of completed (symbol, date range) units so a restarted backfill skips them
+from datetime import datetime
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+JOURNAL_TABLE = 'fetch_journal'
+
+# Local journal used when no database sink is written (Excel/Parquet-only runs)
+LOCAL_JOURNAL_URI = 'sqlite:///fetch_journal.db'
+
+
+def _unit_key(symbol, start_date, end_date):
+    return (str(symbol), str(pd.Timestamp(start_date).date()), str(pd.Timestamp(end_date).date()))
+
+
+# Journal rows live in a table of the sink database, so a unit can be marked complete inside the
+# same transaction that writes its rows: either both commit or neither does
+class ProgressJournal:
+    def __init__(self, engine, run_name):
+        self.engine = engine
+        self.run_name = run_name
+        with engine.begin() as connection:
+            connection.execute(text(
+                f'CREATE TABLE IF NOT EXISTS {JOURNAL_TABLE} ('
+                'run_name TEXT NOT NULL, symbol TEXT NOT NULL, start_date TEXT NOT NULL, end_date TEXT NOT NULL, '
+                'completed_at TEXT NOT NULL, PRIMARY KEY (run_name, symbol, start_date, end_date))'))
+            rows = connection.execute(text(f'SELECT symbol, start_date, end_date FROM {JOURNAL_TABLE} WHERE run_name = :run_name'),
+                                      {'run_name': run_name})
+            self.completed = {tuple(row) for row in rows}
+        if self.completed:
+            print(f"Resuming run '{run_name}': {len(self.completed)} unit(s) already complete.")
+
+    def is_done(self, symbol, start_date, end_date):
+        return _unit_key(symbol, start_date, end_date) in self.completed
+
+    # Function to drop already-completed units from a plan with Symbol/Start Date/End Date columns
+    def pending(self, plan):
+        if plan.empty or not self.completed:
+            return plan
+        done = [self.is_done(symbol, start, end) for symbol, start, end in zip(plan['Symbol'], plan['Start Date'], plan['End Date'])]
+        print(f"Skipping {sum(done)} unit(s) completed by an earlier run.")
+        return plan[[not flag for flag in done]].reset_index(drop=True)
+
+    # Pass the sink's open transaction as `connection` to commit the journal entry together with the rows
+    # Units ending after today may still hold a partial bar, so they are left to be fetched again
+    def mark_done(self, units, connection=None):
+        today = pd.Timestamp.today().normalize()
+        keys = [_unit_key(*unit) for unit in units if pd.Timestamp(unit[2]).normalize() <= today]
+        if not keys:
+            return
+        completed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        statement = text(f'INSERT INTO {JOURNAL_TABLE} (run_name, symbol, start_date, end_date, completed_at) '
+                         'VALUES (:run_name, :symbol, :start_date, :end_date, :completed_at) '
+                         'ON CONFLICT (run_name, symbol, start_date, end_date) DO NOTHING')
+        params = [{'run_name': self.run_name, 'symbol': symbol, 'start_date': start, 'end_date': end,
+                   'completed_at': completed_at} for symbol, start, end in keys]
+
+        if connection is not None:
+            connection.execute(statement, params)
+        else:
+            with self.engine.begin() as own_connection:
+                own_connection.execute(statement, params)
+        self.completed.update(keys)
+
+    def reset(self):
+        with self.engine.begin() as connection:
+            connection.execute(text(f'DELETE FROM {JOURNAL_TABLE} WHERE run_name = :run_name'), {'run_name': self.run_name})
+        self.completed.clear()
+
+    # Function to close a run that completed cleanly: its units are cleared so the next run of the same
+    # workbook fetches everything again; only an interrupted run leaves units behind to resume from
+    def finish(self):
+        if self.completed:
+            print(f"Run '{self.run_name}' complete; clearing {len(self.completed)} journaled unit(s).")
+        self.reset()
+
+
+# Function to open the journal in the sink database, or in a local SQLite file when there is none
+def open_journal(run_name, engine=None):
+    return ProgressJournal(engine if engine is not None else create_engine(LOCAL_JOURNAL_URI), run_name)
@@ -0,0 +1,47 @@
+## Request planner that merges overlapping or adjacent (Symbol, Start Date, End Date) rows
+import pandas as pd
+from price_cache import merge_ranges
+from price_schema import concat_price_frames
+
+
+# Function to merge each symbol's windows into the minimal set of [Start Date, End Date) fetches
+def plan_fetches(rows):
+    plan = []
+    extra_columns = [col for col in rows.columns if col not in ('Symbol', 'Start Date', 'End Date')]
+
+    for symbol, symbol_rows in rows.groupby('Symbol', sort=False):
+        windows = [(pd.Timestamp(start), pd.Timestamp(end))
+                   for start, end in zip(symbol_rows['Start Date'], symbol_rows['End Date'])
+                   if pd.notna(start) and pd.notna(end) and start < end]
+
+        # Carry the symbol's other columns (e.g. Company Code) onto every planned fetch
+        details = symbol_rows.iloc[0][extra_columns].to_dict()
+        for start, end in merge_ranges(windows):
+            plan.append({'Symbol': symbol, 'Start Date': start, 'End Date': end, **details})
+
+    plan_df = pd.DataFrame(plan, columns=['Symbol', 'Start Date', 'End Date'] + extra_columns)
+    print(f"Planned {len(plan_df)} fetches for {len(rows)} input rows.")
+    return plan_df
+
+
+# Function to slice fetched per-symbol frames back out for each original input row
+def slice_for_rows(rows, fetched_frames):
+    fetched = concat_price_frames(fetched_frames)
+    if fetched.empty:
+        return []
+
+    by_symbol = {symbol: data for symbol, data in fetched.groupby('Symbol', sort=False, observed=True)}
+
+    sliced = []
+    for index, row in rows.iterrows():
+        data = by_symbol.get(row['Symbol'])
+        if data is None:
+            print(f"No data found for {row['Symbol']}")
+            continue
+        in_range = (data['Date'] >= row['Start Date']) & (data['Date'] < row['End Date'])
+        row_data = data[in_range].reset_index(drop=True)
+        if not row_data.empty:
+            sliced.append(row_data)
+        else:
+            print(f"No data found for {row['Symbol']} from {row['Start Date']} to {row['End Date']}")
+    return sliced
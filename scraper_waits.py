@@ -0,0 +1,119 @@
+## Condition-based waits for the BSE scrapers, with per-step timings to show which waits dominate
+import time
+import threading
+from contextlib import contextmanager
+import pandas as pd
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+# Seconds each wait may take before it raises TimeoutException; tune from the step timings report
+WAIT_TIMEOUTS = {
+    'listing': 10,  # Result rows after Submit
+    'link_clickable': 5,  # Filing link ready to click
+    'new_window': 10,  # Filing tab opened by the link
+    'document_ready': 15,  # document.readyState == 'complete' in the filing tab
+    'filing_content': 15,  # ix:header (iXBRL) or the XML viewer's source element (XBRL)
+    'window_closed': 5,  # Back to the results window after closing the filing tab
+}
+POLL_INTERVAL = 0.1
+
+XML_VIEWER_ID = 'webkit-xml-viewer-source-xml'
+IXBRL_NAMESPACE = 'http://www.xbrl.org/2013/inlineXBRL'
+
+
+# Collects how long each named step took, across threads; one timer per script run
+class StepTimer:
+    def __init__(self):
+        self.records = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def step(self, name):
+        started = time.perf_counter()
+        status = 'ok'
+        try:
+            yield
+        except Exception:
+            status = 'failed'
+            raise
+        finally:
+            with self.lock:
+                self.records.append((name, time.perf_counter() - started, status))
+
+    # Function to summarise timings per step, slowest total first
+    def summary(self):
+        with self.lock:
+            timings = pd.DataFrame(self.records, columns=['Step', 'Seconds', 'Status'])
+        if timings.empty:
+            return timings
+        grouped = timings.groupby('Step')
+        summary = pd.DataFrame({
+            'Count': grouped.size(),
+            'Failed': grouped['Status'].apply(lambda status: int((status == 'failed').sum())),
+            'Total s': grouped['Seconds'].sum().round(2),
+            'Mean s': grouped['Seconds'].mean().round(3),
+            'Max s': grouped['Seconds'].max().round(3),
+        })
+        return summary.sort_values('Total s', ascending=False).reset_index()
+
+    def report(self):
+        summary = self.summary()
+        if summary.empty:
+            return
+        print("Step timings:")
+        print(summary.to_string(index=False))
+
+
+step_timer = StepTimer()
+
+
+def _timeout(name, timeout):
+    return WAIT_TIMEOUTS[name] if timeout is None else timeout
+
+
+def _wait(driver, name, condition, timeout=None, timer=None):
+    with (timer or step_timer).step(name):
+        return WebDriverWait(driver, _timeout(name, timeout), poll_frequency=POLL_INTERVAL).until(condition)
+
+
+# Function to wait for the result rows of a security code; returns [] when none appear in time
+def wait_for_elements(driver, xpath, name='listing', timeout=None, timer=None):
+    try:
+        return _wait(driver, name, EC.presence_of_all_elements_located((By.XPATH, xpath)), timeout, timer)
+    except Exception:
+        return []
+
+
+def wait_for_clickable(driver, element, timeout=None, timer=None):
+    return _wait(driver, 'link_clickable', EC.element_to_be_clickable(element), timeout, timer)
+
+
+# Function to wait until more than `previous_count` windows are open and return the newest handle
+def wait_for_new_window(driver, previous_count, timeout=None, timer=None):
+    _wait(driver, 'new_window', lambda d: len(d.window_handles) > previous_count, timeout, timer)
+    return driver.window_handles[-1]
+
+
+def wait_for_window_count(driver, count, timeout=None, timer=None):
+    return _wait(driver, 'window_closed', lambda d: len(d.window_handles) == count, timeout, timer)
+
+
+def wait_for_document_ready(driver, timeout=None, timer=None):
+    return _wait(driver, 'document_ready', lambda d: d.execute_script("return document.readyState") == 'complete',
+                 timeout, timer)
+
+
+def _filing_kind(driver):
+    if driver.find_elements(By.ID, XML_VIEWER_ID):
+        return 'xml'
+    has_ixbrl = driver.execute_script(
+        "return document.getElementsByTagName('ix:header').length"
+        " + document.getElementsByTagNameNS(arguments[0], 'header').length > 0", IXBRL_NAMESPACE)
+    return 'html' if has_ixbrl else False
+
+
+# Function to wait for the filing tab to finish loading and return 'html' (iXBRL) or 'xml' (XBRL viewer)
+def wait_for_filing(driver, timeout=None, timer=None):
+    wait_for_document_ready(driver, timeout, timer)
+    return _wait(driver, 'filing_content', _filing_kind, timeout, timer)
@@ -0,0 +1,159 @@
+## Local stub of the BSE results page (ASP.NET postback) and filing documents for testing bse_http_fetcher offline
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from bse_http_fetcher import BseHttpFetcher, LINK_OFFSET
+
+# Optional folder of recorded pages: form.html, listing_<code>.html and filings/<file>; missing pages are synthesised
+STUB_PAGES_DIR = "stub_bse_pages"
+
+# Recorded iXBRL filing served for the synthetic .html links when present
+RECORDED_IXBRL = "RELIANCE_MQ2024-2025.html"
+
+VIEWSTATE = "dDwtMTA4MzQ2NTk1Njs7Pg=="
+EVENT_VALIDATION = "L2Z4bGFzaGJhY2s7Pg=="
+RESULTS_PATH = "/corporates/Comp_Resultsnew.aspx"
+
+FORM_PAGE = f"""<html><body>
+<form method="post" action="./Comp_Resultsnew.aspx" id="form1">
+<input type="hidden" name="__EVENTTARGET" id="__EVENTTARGET" value="" />
+<input type="hidden" name="__EVENTARGUMENT" id="__EVENTARGUMENT" value="" />
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{VIEWSTATE}" />
+<input type="hidden" name="__VIEWSTATEGENERATOR" id="__VIEWSTATEGENERATOR" value="A1B2C3D4" />
+<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="{EVENT_VALIDATION}" />
+<input name="ctl00$ContentPlaceHolder1$SmartSearch$smartSearch" type="text" id="ContentPlaceHolder1_SmartSearch_smartSearch" />
+<input type="hidden" name="ctl00$ContentPlaceHolder1$SmartSearch$hdnCode" id="ContentPlaceHolder1_SmartSearch_hdnCode" value="" />
+<select name="ctl00$ContentPlaceHolder1$broadcastdd" id="ContentPlaceHolder1_broadcastdd">
+<option selected="selected" value="0">Select</option><option value="7">Financial Results</option>
+</select>
+<input type="submit" name="ctl00$ContentPlaceHolder1$btnSubmit" value="Submit" id="ContentPlaceHolder1_btnSubmit" />
+</form></body></html>"""
+
+SYNTHETIC_XBRL = """<?xml version="1.0" encoding="UTF-8"?>
+<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:in-bse-fin="http://www.bseindia.com/xbrl/fin/2020-03-31/in-bse-fin">
+<in-bse-fin:ScripCode contextRef="OneD">{code}</in-bse-fin:ScripCode>
+<in-bse-fin:DateOfEndOfReportingPeriod contextRef="OneD">{period}</in-bse-fin:DateOfEndOfReportingPeriod>
+</xbrli:xbrl>"""
+
+SYNTHETIC_IXBRL = """<html xmlns="http://www.w3.org/1999/xhtml" xmlns:ix="http://www.xbrl.org/2013/inlineXBRL"><body>
+<div style="display:none"><ix:header><ix:resources></ix:resources></ix:header></div><p>{code} {period}</p></body></html>"""
+
+
+# Filings listed for every security code: (file name, document file), one XBRL and one iXBRL like the real listing
+def stub_filings(code):
+    return [("MQ2023-2024", f"{code}_MQ2023-2024.xml"), ("MQ2024-2025", f"{code}_MQ2024-2025.html")]
+
+
+# Function to list the document each filing row links to in the link column of the layout
+# link_offset=5: one document link in td[5]; link_offset=6: the iXBRL link in td[5] and the XBRL link in td[6],
+# the layout the XML-only Consolidated_xml scripts read
+def stub_documents(code, link_offset=LINK_OFFSET):
+    if link_offset == LINK_OFFSET:
+        return stub_filings(code)
+    return [(file_name, f"{code}_{file_name}.xml") for file_name, document in stub_filings(code)]
+
+
+def listing_page(code, link_offset=LINK_OFFSET):
+    rows = []
+    for file_name, document in stub_filings(code):
+        stem = os.path.splitext(document)[0]
+        documents = [document] if link_offset == LINK_OFFSET else [f"{stem}.html", f"{stem}.xml"]
+        links = "".join(f"<td><a href='javascript:void(0);' onclick=\"window.open('/filings/{linked}')\">"
+                        f"{'XBRL' if linked.endswith('.xml') else 'iXBRL'}</a></td>" for linked in documents)
+        # Cells after the code: company, segment, period (file name link), date, document link(s)
+        rows.append(f"<tr><td>{code}</td><td>Company {code}</td><td>Equity</td>"
+                    f"<td><a href='#'>{file_name}</a></td><td>18 Oct 2026</td>{links}</tr>")
+    return f"<html><body><table id='ContentPlaceHolder1_gvData'>{''.join(rows)}</table></body></html>"
+
+
+class BseHandler(BaseHTTPRequestHandler):
+    pages_dir = STUB_PAGES_DIR
+    link_offset = LINK_OFFSET  # Listing layout served to postbacks (see stub_documents)
+
+    def _recorded(self, *parts):
+        path = os.path.join(self.pages_dir, *parts)
+        if os.path.isfile(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                return file.read()
+        return None
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8"):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == RESULTS_PATH:
+            self._send(200, self._recorded("form.html") or FORM_PAGE)
+        elif path.startswith("/filings/"):
+            document = os.path.basename(path)
+            code, period = os.path.splitext(document)[0].split("_", 1)
+            recorded = self._recorded("filings", document)
+            if document.endswith(".xml"):
+                self._send(200, recorded or SYNTHETIC_XBRL.format(code=code, period=period), "text/xml; charset=utf-8")
+            else:
+                if recorded is None and os.path.isfile(RECORDED_IXBRL):
+                    with open(RECORDED_IXBRL, 'r', encoding='utf-8') as file:
+                        recorded = file.read()
+                self._send(200, recorded or SYNTHETIC_IXBRL.format(code=code, period=period))
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if urlparse(self.path).path != RESULTS_PATH:
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        fields = {name: values[0] for name, values in parse_qs(self.rfile.read(length).decode('utf-8'), keep_blank_values=True).items()}
+
+        # Reject postbacks a real ASP.NET page would reject: stale state, missing validation or no result type
+        if fields.get("__VIEWSTATE") != VIEWSTATE or fields.get("__EVENTVALIDATION") != EVENT_VALIDATION:
+            self.send_error(500, "Invalid viewstate")
+            return
+        code = fields.get("ctl00$ContentPlaceHolder1$SmartSearch$hdnCode", "")
+        if fields.get("ctl00$ContentPlaceHolder1$broadcastdd") != "7" or not code or "ctl00$ContentPlaceHolder1$btnSubmit" not in fields:
+            self._send(200, "<html><body><table></table></body></html>")
+            return
+        self._send(200, self._recorded(f"listing_{code}.html") or listing_page(code, self.link_offset))
+
+    def log_message(self, format, *args):
+        pass  # Keep test output readable
+
+
+# Function to start the stub in a background thread; returns (server, results page URL)
+def start_stub_server(port=0, pages_dir=STUB_PAGES_DIR, link_offset=LINK_OFFSET):
+    handler = type("StubBseHandler", (BseHandler,), {"pages_dir": pages_dir, "link_offset": link_offset})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}{RESULTS_PATH}"
+
+
+# Function to run the HTTP fetcher against the stub and check it writes the files the browser scrapers would
+# link_offset=6 checks the td[6] layout the Consolidated_xml scripts use
+def verify_fetcher(codes=("500325", "532540"), link_offset=LINK_OFFSET):
+    server, results_url = start_stub_server(link_offset=link_offset)
+    fetcher = BseHttpFetcher(results_url, link_offset=link_offset)
+    try:
+        with tempfile.TemporaryDirectory() as save_folder:
+            for code in codes:
+                outcome = fetcher.save_filings(code, f"STOCK{code}", save_folder)
+                expected = {f"STOCK{code}_{file_name}.{os.path.splitext(document)[1][1:]}" for file_name, document in stub_documents(code, link_offset)}
+                saved = {name for name in os.listdir(save_folder) if name.startswith(f"STOCK{code}_")}
+                status = "ok" if outcome is not None and not outcome[1] and saved == expected else "MISMATCH"
+                print(f"{code} (link td[{link_offset}]): {status} ({sorted(saved)})")
+    finally:
+        fetcher.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    for link_offset in (LINK_OFFSET, 6):
+        verify_fetcher(tuple(sys.argv[1:]) or ("500325", "532540"), link_offset)
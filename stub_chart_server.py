@@ -0,0 +1,128 @@
+## Local stub of the Yahoo chart endpoint for measuring fetch throughput offline
+import sys
+import json
+import time
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import pandas as pd
+from fetch_engine import iter_fetch_results, fetch_chart_http, AdaptiveConcurrency
+
+# Simulated server-side latency per request, in seconds
+STUB_LATENCY = 0.05
+
+
+# Function to build a deterministic daily chart payload for a symbol
+def build_chart_payload(symbol, period1, period2):
+    dates = pd.bdate_range(pd.to_datetime(period1, unit='s'), pd.to_datetime(period2, unit='s'), inclusive='left')
+    seed = zlib.crc32(symbol.encode('utf-8')) % 1000
+    base = 100 + seed / 10
+    closes = [round(base + (i % 20) - 10 + seed % 7, 2) for i in range(len(dates))]
+    return {
+        "chart": {
+            "result": [{
+                "meta": {"symbol": symbol, "currency": "INR", "exchangeTimezoneName": "Asia/Kolkata"},
+                "timestamp": [int(date.timestamp()) for date in dates],
+                "indicators": {"quote": [{
+                    "open": [close - 1 for close in closes],
+                    "high": [close + 2 for close in closes],
+                    "low": [close - 2 for close in closes],
+                    "close": closes,
+                    "volume": [100000 + seed * 10 + i for i in range(len(dates))],
+                }]},
+            }],
+            "error": None,
+        }
+    }
+
+
+class ChartHandler(BaseHTTPRequestHandler):
+    latency = STUB_LATENCY
+    max_in_flight = None  # When set, requests above this many in flight get HTTP 429, like a throttling Yahoo
+    in_flight = None  # [count], shared by the handler class of one server
+    lock = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not url.path.startswith("/v8/finance/chart/"):
+            self.send_error(404)
+            return
+
+        symbol = url.path.rsplit("/", 1)[-1]
+        query = parse_qs(url.query)
+        period1 = int(query.get("period1", ["0"])[0])
+        period2 = int(query.get("period2", [str(int(time.time()))])[0])
+
+        with self.lock:
+            self.in_flight[0] += 1
+            throttled = self.max_in_flight is not None and self.in_flight[0] > self.max_in_flight
+        try:
+            time.sleep(self.latency)
+        finally:
+            with self.lock:
+                self.in_flight[0] -= 1
+        if throttled:
+            self.send_error(429, "Too Many Requests")
+            return
+
+        body = json.dumps(build_chart_payload(symbol, period1, period2)).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output readable
+
+
+# Function to start the stub server in a background thread; returns (server, chart base URL)
+def start_stub_server(port=0, latency=STUB_LATENCY, max_in_flight=None):
+    handler = type("StubChartHandler", (ChartHandler,), {"latency": latency, "max_in_flight": max_in_flight,
+                                                         "in_flight": [0], "lock": threading.Lock()})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v8/finance/chart"
+
+
+# Function to measure engine throughput against the stub server
+def measure_throughput(symbol_count=200, max_concurrency=8, rate=50.0, burst=8, latency=STUB_LATENCY):
+    server, base_url = start_stub_server(latency=latency)
+    try:
+        jobs = [(f"SYM{i}.NS", "2024-01-01", "2024-12-31", base_url) for i in range(symbol_count)]
+        started = time.perf_counter()
+        rows = 0
+        for job, data in iter_fetch_results(jobs, fetch_chart_http, max_concurrency, rate, burst):
+            rows += len(data)
+        elapsed = time.perf_counter() - started
+    finally:
+        server.shutdown()
+
+    print(f"{symbol_count} symbols, concurrency {max_concurrency}, rate {rate}/s: "
+          f"{elapsed:.2f}s, {symbol_count / elapsed:.1f} symbols/s, {rows / elapsed:.0f} rows/s")
+    return elapsed
+
+
+# Function to show the adaptive controller settling below a server that throttles above `server_limit` requests in flight
+def measure_adaptive(symbol_count=200, server_limit=6, maximum=32, rate=1000.0, latency=STUB_LATENCY):
+    server, base_url = start_stub_server(latency=latency, max_in_flight=server_limit)
+    controller = AdaptiveConcurrency(initial=2, maximum=maximum)
+    try:
+        jobs = [(f"SYM{i}.NS", "2024-01-01", "2024-12-31", base_url) for i in range(symbol_count)]
+        started = time.perf_counter()
+        missing = sum(data.empty for job, data in iter_fetch_results(jobs, fetch_chart_http, rate=rate, burst=maximum, controller=controller))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.shutdown()
+
+    print(f"{symbol_count} symbols against a server limit of {server_limit}: {elapsed:.2f}s, {missing} missing; {controller.describe()}")
+    return controller.snapshot()
+
+
+if __name__ == "__main__":
+    symbol_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    for concurrency in (1, 4, 8, 16):
+        measure_throughput(symbol_count, concurrency, rate=1000.0, burst=concurrency)
+    measure_adaptive(symbol_count)
@@ -0,0 +1,172 @@
+## Exchange-suffix resolution: try .NS, then .BO, remember the venue that worked and skip symbols with no data anywhere
+import os
+import json
+import threading
+from datetime import datetime, timedelta
+import pandas as pd
+
+# Venues tried, in order, for a symbol whose suffix is not known yet
+CANDIDATE_SUFFIXES = ['.NS', '.BO']
+
+# Persistent cache: {"resolved": {symbol: suffix}, "dead": {symbol: ISO time the symbol was found empty everywhere},
+#                    "misses": {symbol: consecutive runs the symbol came back empty on every venue}}
+SUFFIX_CACHE_FILE = "suffix_cache.json"
+
+# Symbols with no data on any venue are skipped for this long, then tried again
+NEGATIVE_TTL_DAYS = 7
+
+# A symbol is only marked dead after coming back empty on every venue in this many consecutive runs;
+# yfinance returns empty frames for throttled or failed requests too, so one empty run proves nothing
+DEAD_AFTER_RUNS = 3
+
+# yf.download and Ticker.history report per-ticker failures in yf.shared._ERRORS instead of raising; these messages mean the
+# ticker genuinely has no prices on that venue, anything else (throttling, timeouts, bad responses) is a failure
+NO_DATA_ERROR_MARKERS = ('no data found', 'no price data found', 'possibly delisted', 'no timezone found')
+
+
+# Function to read the per-ticker errors yfinance recorded (empty when yfinance does not expose them)
+# yfinance never clears entries written by Ticker.history, so callers snapshot the errors before a request and pass the
+# snapshot as `before`: only entries written since then are returned. yfinance stores a new string per failure, so an
+# identical message from a repeated failure still counts as new
+def download_errors(before=None):
+    import yfinance as yf
+    errors = dict(getattr(getattr(yf, 'shared', None), '_ERRORS', None) or {})
+    if before is None:
+        return errors
+    return {ticker: error for ticker, error in errors.items() if before.get(ticker) is not error}
+
+
+def is_no_data_error(error):
+    return error is None or any(marker in str(error).lower() for marker in NO_DATA_ERROR_MARKERS)
+
+
+# Function for fetch functions built on yf.download or Ticker.history: raise when an empty result was a failure rather than
+# "no data", so the resolver neither tries the next venue on a failed one nor counts it as a miss
+# `before` is the download_errors() snapshot taken just before the request, so errors from earlier requests are ignored
+def raise_for_download_error(ticker, data, before):
+    if data.empty:
+        error = download_errors(before).get(ticker)
+        if not is_no_data_error(error):
+            raise RuntimeError(f"yf.download failed for {ticker}: {error}")
+    return data
+
+
+# Shared by the fetch workers; every cache update happens under one lock
+class SuffixResolver:
+    def __init__(self, cache_file=SUFFIX_CACHE_FILE, suffixes=CANDIDATE_SUFFIXES, negative_ttl_days=NEGATIVE_TTL_DAYS,
+                 dead_after_runs=DEAD_AFTER_RUNS):
+        self.cache_file = cache_file
+        self.suffixes = list(suffixes)
+        self.negative_ttl = timedelta(days=negative_ttl_days)
+        self.dead_after_runs = dead_after_runs
+        self.lock = threading.Lock()
+        self.resolved = {}
+        self.dead = {}
+        self.misses = {}
+        self.missed_this_run = set()
+
+        if cache_file and os.path.exists(cache_file):
+            with open(cache_file, 'r', encoding='utf-8') as file:
+                cache = json.load(file)
+            self.resolved = dict(cache.get('resolved', {}))
+            self.dead = {symbol: datetime.fromisoformat(found_at) for symbol, found_at in cache.get('dead', {}).items()}
+            self.misses = {symbol: int(count) for symbol, count in cache.get('misses', {}).items()}
+
+    def known_suffix(self, symbol):
+        return self.resolved.get(symbol)
+
+    def is_dead(self, symbol):
+        with self.lock:
+            found_at = self.dead.get(symbol)
+            if found_at is None:
+                return False
+            if datetime.now() - found_at >= self.negative_ttl:
+                del self.dead[symbol]  # Expired: give the symbol another try
+                return False
+            return True
+
+    # Function to list the suffixes to try: the resolved one alone, else the preferred one followed by the candidates
+    def candidates(self, symbol, preferred=None):
+        known = self.known_suffix(symbol)
+        if known is not None:
+            return [known]
+        return list(dict.fromkeys(([preferred] if preferred else []) + self.suffixes))
+
+    def record_success(self, symbol, suffix, symbol_master=None):
+        with self.lock:
+            self.resolved[symbol] = suffix
+            self.dead.pop(symbol, None)
+            self.misses.pop(symbol, None)
+        if symbol_master is not None:
+            symbol_master.set_suffix(symbol, suffix)
+
+    def record_dead(self, symbol):
+        with self.lock:
+            self.dead[symbol] = datetime.now()
+            self.misses.pop(symbol, None)
+
+    # Function to count a run in which the symbol came back empty on every venue without an error
+    # (counted once per run); the symbol is marked dead once that happened in dead_after_runs runs in a row
+    def record_miss(self, symbol):
+        with self.lock:
+            if symbol in self.missed_this_run:
+                return
+            self.missed_this_run.add(symbol)
+            self.misses[symbol] = self.misses.get(symbol, 0) + 1
+            if self.misses[symbol] < self.dead_after_runs:
+                print(f"{symbol}: no data on any of {self.suffixes} ({self.misses[symbol]}/{self.dead_after_runs} runs)")
+                return
+        self.record_dead(symbol)
+
+    # Function to fetch a symbol through fetch_func(ticker), trying each candidate venue until one returns rows
+    # Returns (data, ticker); `skip` lists suffixes the caller already tried cleanly (e.g. in a multi-ticker
+    # batch, with no error reported for the ticker); errors raised by fetch_func propagate and count as no miss
+    def fetch(self, symbol, fetch_func, symbol_master=None, skip=()):
+        if self.is_dead(symbol):
+            print(f"Skipping {symbol}: no data on any of {self.suffixes} (cached until the negative TTL expires)")
+            return pd.DataFrame(), None
+
+        preferred = symbol_master.suffix(symbol) if symbol_master is not None else None
+        known = self.known_suffix(symbol)
+        ticker = None
+        for suffix in self.candidates(symbol, preferred):
+            if suffix in skip:
+                continue
+            ticker = f"{symbol}{suffix}"
+            data = fetch_func(ticker)
+            if not data.empty:
+                if suffix != known:
+                    self.record_success(symbol, suffix, symbol_master)
+                return data, ticker
+
+        # A resolved symbol can legitimately return nothing for one window; only unresolved ones count as a miss
+        if known is None:
+            self.record_miss(symbol)
+        return pd.DataFrame(), ticker
+
+    # Function to point the symbol master at every suffix resolved by earlier runs
+    def apply(self, symbol_master):
+        for symbol, suffix in list(self.resolved.items()):
+            if symbol in symbol_master:
+                symbol_master.set_suffix(symbol, suffix)
+
+    # Function to drop known-dead symbols from a plan with a Symbol column
+    def drop_dead(self, plan):
+        if plan.empty:
+            return plan
+        dead = plan['Symbol'].map(self.is_dead).astype(bool)
+        if dead.any():
+            print(f"Skipping {int(dead.sum())} window(s) of symbols with no data on any venue.")
+        return plan[~dead].reset_index(drop=True)
+
+    def save(self):
+        if not self.cache_file:
+            return
+        with self.lock:
+            cache = {'resolved': dict(sorted(self.resolved.items())),
+                     'dead': {symbol: found_at.isoformat(timespec='seconds') for symbol, found_at in sorted(self.dead.items())},
+                     'misses': dict(sorted(self.misses.items()))}
+        # Write to a temporary file first so an interrupted run never leaves a truncated cache
+        with open(self.cache_file + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(cache, file, indent=2)
+        os.replace(self.cache_file + '.tmp', self.cache_file)
@@ -0,0 +1,67 @@
+## Symbol master loaded once per run: symbol <-> security code <-> Yahoo ticker lookups
+import pandas as pd
+
+# Suffix used when the input has no exchange information (National Stock Exchange of India)
+DEFAULT_SUFFIX = '.NS'
+
+# Exchange names accepted in an optional 'Exchange' column
+EXCHANGE_SUFFIXES = {'NSE': '.NS', 'BSE': '.BO'}
+
+
+# Function to normalise a symbol or security code into the key the lookups are indexed by
+def symbol_key(value):
+    return str(value).strip()
+
+
+# Dictionary-backed lookups built once from the input workbook and shared by the fetch functions
+# Every lookup normalises its argument with symbol_key, like the index, so ' TCS ' and 'TCS' are the same symbol
+class SymbolMaster:
+    def __init__(self, details, default_suffix=DEFAULT_SUFFIX):
+        code_column = 'Security Code' if 'Security Code' in details.columns else 'Company Code'
+        rows = details.dropna(subset=['Symbol']).drop_duplicates(subset=['Symbol'])
+        symbols = [symbol_key(symbol) for symbol in rows['Symbol']]
+
+        if 'Exchange' in rows.columns:
+            suffixes = [EXCHANGE_SUFFIXES.get(str(exchange).strip().upper(), default_suffix) for exchange in rows['Exchange']]
+        else:
+            suffixes = [default_suffix] * len(symbols)
+
+        self.default_suffix = default_suffix
+        self.code_by_symbol = dict(zip(symbols, rows[code_column]))
+        self.symbol_by_code = {symbol_key(code): symbol for symbol, code in self.code_by_symbol.items()}
+        self.suffix_by_symbol = dict(zip(symbols, suffixes))
+        self.symbol_by_ticker = {symbol + suffix: symbol for symbol, suffix in self.suffix_by_symbol.items()}
+
+    def __len__(self):
+        return len(self.code_by_symbol)
+
+    def __contains__(self, symbol):
+        return symbol_key(symbol) in self.code_by_symbol
+
+    def security_code(self, symbol):
+        return self.code_by_symbol.get(symbol_key(symbol))
+
+    def symbol_for_code(self, security_code):
+        return self.symbol_by_code.get(symbol_key(security_code))
+
+    def suffix(self, symbol):
+        return self.suffix_by_symbol.get(symbol_key(symbol), self.default_suffix)
+
+    def ticker(self, symbol):
+        return f"{symbol_key(symbol)}{self.suffix(symbol)}"
+
+    def symbol_for_ticker(self, ticker):
+        return self.symbol_by_ticker.get(symbol_key(ticker))
+
+    def set_suffix(self, symbol, suffix):
+        symbol = symbol_key(symbol)
+        self.symbol_by_ticker.pop(self.ticker(symbol), None)
+        self.suffix_by_symbol[symbol] = suffix
+        self.symbol_by_ticker[symbol + suffix] = symbol
+
+
+# Function to load the symbol master from an Excel file with 'Symbol' and 'Security Code' columns
+def load_symbol_master(file_path, default_suffix=DEFAULT_SUFFIX):
+    details = pd.read_excel(file_path)
+    details.columns = details.columns.str.strip()
+    return SymbolMaster(details, default_suffix)
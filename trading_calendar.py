@@ -0,0 +1,99 @@
+## NSE trading-calendar index: skip windows without sessions and find real gaps in fetched frames
+import os
+import numpy as np
+import pandas as pd
+
+# Local holiday list: a CSV with a 'Date' column (or dates in the first column) of YYYY-MM-DD exchange holidays
+HOLIDAY_FILE = "nse_holidays.csv"
+CALENDAR_START = "2000-01-01"
+
+
+# Sorted array of session dates (weekdays minus exchange holidays) with searchsorted lookups
+# `complete` is False when the holiday list is unknown: every holiday then looks like a session, so the
+# calendar still skips weekends but no longer claims a missing or empty weekday is a real gap
+class TradingCalendar:
+    def __init__(self, holidays=(), start=CALENDAR_START, end=None, complete=True):
+        end = end if end is not None else pd.Timestamp.today().normalize() + pd.DateOffset(years=1)
+        weekdays = pd.bdate_range(start, end)
+        self.sessions = weekdays.difference(pd.DatetimeIndex(holidays).normalize()).values
+        self.complete = complete
+
+    def _bounds(self, start_dates, end_dates):
+        # Sessions are [start, end); nothing after today has traded yet
+        last = np.datetime64(pd.Timestamp.today().normalize() + pd.Timedelta(days=1), 'ns')
+        starts = pd.DatetimeIndex(start_dates).normalize().values
+        ends = np.minimum(pd.DatetimeIndex(end_dates).normalize().values, last)
+        return np.searchsorted(self.sessions, starts, 'left'), np.searchsorted(self.sessions, ends, 'left')
+
+    def session_counts(self, start_dates, end_dates):
+        first, stop = self._bounds(start_dates, end_dates)
+        return np.maximum(stop - first, 0)
+
+    def has_sessions(self, start_date, end_date):
+        return bool(self.session_counts([start_date], [end_date])[0] > 0)
+
+    # Function to tell whether an empty result for the window means the fetch failed (throttled, error)
+    # rather than a window without bars; never without the holiday list
+    def expects_data(self, start_date, end_date):
+        return self.complete and self.has_sessions(start_date, end_date)
+
+    def sessions_between(self, start_date, end_date):
+        first, stop = self._bounds([start_date], [end_date])
+        return self.sessions[first[0]:max(stop[0], first[0])]
+
+    def missing_sessions(self, dates, start_date, end_date):
+        expected = self.sessions_between(start_date, end_date)
+        fetched = pd.DatetimeIndex(dates).normalize().values
+        return expected[~np.isin(expected, fetched)]
+
+    def missing_ranges(self, dates, start_date, end_date):
+        # Without the holiday list every exchange holiday would come back as a gap to re-request
+        if not self.complete:
+            return []
+        # Group runs of consecutive missing sessions into [first, day after last) windows
+        missing = self.missing_sessions(dates, start_date, end_date)
+        if len(missing) == 0:
+            return []
+        positions = np.searchsorted(self.sessions, missing)
+        run_starts = np.flatnonzero(np.diff(positions, prepend=-2) != 1)
+        run_ends = np.append(run_starts[1:], len(missing)) - 1
+        return [(pd.Timestamp(missing[s]), pd.Timestamp(missing[e]) + pd.Timedelta(days=1)) for s, e in zip(run_starts, run_ends)]
+
+
+# Function to drop planned fetches whose window contains no trading session
+def drop_empty_windows(plan, calendar):
+    if plan.empty:
+        return plan
+    keep = calendar.session_counts(plan['Start Date'], plan['End Date']) > 0
+    if not keep.all():
+        print(f"Skipping {int((~keep).sum())} window(s) with no NSE sessions (weekends, holidays or future dates).")
+    return plan[keep].reset_index(drop=True)
+
+
+# Function to list (symbol, start, end) gaps where a symbol returned data but missed expected sessions
+def find_gaps(plan, fetched_frames, calendar):
+    frames = [frame[['Symbol', 'Date']] for frame in fetched_frames if not frame.empty]
+    if not frames:
+        return []
+    fetched = pd.concat(frames, ignore_index=True)
+    dates_by_symbol = {str(symbol): data['Date'] for symbol, data in fetched.groupby('Symbol', sort=False, observed=True)}
+
+    gaps = []
+    for symbol, start_date, end_date in zip(plan['Symbol'], plan['Start Date'], plan['End Date']):
+        dates = dates_by_symbol.get(str(symbol))
+        if dates is None:
+            continue  # Nothing came back at all: a missing symbol, not a gap
+        gaps.extend((symbol, gap_start, gap_end) for gap_start, gap_end in calendar.missing_ranges(dates, start_date, end_date))
+    return gaps
+
+
+# Function to load the calendar from the local holiday file (weekends only when the file is missing)
+def load_trading_calendar(holiday_file=HOLIDAY_FILE):
+    if not os.path.exists(holiday_file):
+        print(f"Holiday file '{holiday_file}' not found; trading calendar will only skip weekends "
+              f"and gap re-requests are disabled.")
+        return TradingCalendar(complete=False)
+
+    holidays = pd.read_csv(holiday_file)
+    column = 'Date' if 'Date' in holidays.columns else holidays.columns[0]
+    return TradingCalendar(pd.to_datetime(holidays[column], errors='coerce').dropna())